@@ -0,0 +1,61 @@
+"""Shared API dependencies (authentication / authorization)."""
+from datetime import UTC, datetime
+from uuid import UUID
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import decode_access_token
+from app.db.session import get_session
+from app.models.user import User
+from app.services.master import get_master_data
+from app.services.member import get_circle_role
+
+# サークル情報・名簿を編集できるサークルロール (「5.4.2. サークル編集・削除時の権限チェック」)
+CIRCLE_EDITOR_ROLES = frozenset({"leader", "editor"})
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    session: AsyncSession = Depends(get_session),
+) -> User:
+    """
+    Authorization: Bearer のトークンからログイン中のユーザーを取得する.
+
+    トークンがない・不正・期限切れの場合と、ユーザーが存在しない・失効済みの場合は 401。
+    """
+    subject = decode_access_token(credentials.credentials) if credentials else None
+    user = None
+    if subject is not None:
+        result = await session.execute(select(User).where(User.auth_user_id == subject))
+        user = result.scalar_one_or_none()
+    if user is None or (user.expire_at is not None and user.expire_at <= datetime.now(UTC)):
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def require_circle_editor(
+    circle_id: UUID,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+) -> User:
+    """
+    サークルの編集権限 (当該サークルの Leader / Editor、または SystemAdmin) を要求する.
+
+    権限がない場合は 403 (許可されたロール以外はすべて拒否する)。
+    """
+    master = await get_master_data(session)
+    if user.sys_role_id == master.system_roles.get("system_admin"):
+        return user
+    role = await get_circle_role(session, circle_id=circle_id, user_id=user.id)
+    if role not in CIRCLE_EDITOR_ROLES:
+        raise HTTPException(status_code=403, detail="Not allowed to edit this circle")
+    return user
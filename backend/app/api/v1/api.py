@@ -1,9 +1,12 @@
 """API v1 router."""
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import circles
+from app.api.v1.endpoints import circles, events
 
 api_router = APIRouter()
 
 # サークル関連エンドポイント
 api_router.include_router(circles.router, prefix="/circles", tags=["circles"])
+
+# 変更フィード (Server-Sent Events)
+api_router.include_router(events.router, prefix="/events", tags=["events"])
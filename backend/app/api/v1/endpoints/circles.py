@@ -1,14 +1,64 @@
 """Circle endpoints."""
-from fastapi import APIRouter, Depends, Query
+import logging
+from uuid import UUID
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import require_circle_editor
+from app.core.config import settings
+from app.core.etag import if_match, if_none_match, version_etag
+from app.core.singleflight import SingleFlight
 from app.db.session import get_session
-from app.models.circle import Circle
+from app.models.circle import (
+    CIRCLE_FIELDS,
+    Circle,
+    CircleMemberRead,
+    CircleRosterUpdate,
+    CircleSuggestion,
+    CircleUpdate,
+)
 from app.models.enums import CircleCategory
-from app.services.circle import get_circles
+from app.services.circle import (
+    VersionConflictError,
+    get_circle,
+    get_circle_for_update,
+    get_circles,
+    update_circle,
+)
+from app.services.circle_index import circle_index
+from app.services.jobs import enqueue
+from app.services.member import RosterError, update_circle_roster
+from app.services.ogp import OgpFontUnavailableError, get_ogp_image
+from app.services.ranking import get_recent_circles_body
+from app.services.suggest import suggest_circles
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# 同一条件の一覧取得が同時に来た場合は、DBへの問い合わせを1回にまとめる
+circles_flight = SingleFlight("list_circles")
+
+
+def circle_fields(
+    fields: str | None = Query(
+        None,
+        description="取得するフィールド (カンマ区切り、例: name,category,logo_url。id は常に含む)",
+    ),
+) -> tuple[str, ...] | None:
+    """fields= を CIRCLE_FIELDS の順に並べたタプルに変換する (未指定の場合は None)."""
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = sorted(requested - set(CIRCLE_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    requested.add("id")
+    return tuple(field for field in CIRCLE_FIELDS if field in requested)
+
 
 @router.get("", response_model=list[Circle])
 async def list_circles(
@@ -17,8 +67,9 @@ async def list_circles(
     q: str | None = Query(None, description="検索キーワード (名前・説明文)"),
     limit: int = Query(20, ge=1, le=100, description="取得件数上限 (1-100、デフォルト: 20)"),
     offset: int = Query(0, ge=0, description="オフセット (デフォルト: 0)"),
+    fields: tuple[str, ...] | None = Depends(circle_fields),
     session: AsyncSession = Depends(get_session),
-) -> list[Circle]:
+) -> list[Circle] | list[dict] | Response:
     """
     サークル一覧を取得する.
 
@@ -26,13 +77,254 @@ async def list_circles(
     - 削除されたサークルは除外する
     - キャンパス・カテゴリ・キーワードでフィルタリング可能
     - limit/offset でページネーション対応
+    - 同一条件の同時リクエストは1回のクエリにまとめられる
+    - キーワード検索を含まない場合は、メモリ上のスナップショットから応答する (有効時のみ)
+    - fields= を指定した場合は、指定したフィールドのみをDBから取得して返す
     """
-    circles = await get_circles(
-        session=session,
-        campus_id=campus_id,
-        category=category,
-        search_query=q,
-        limit=limit,
-        offset=offset,
+    if settings.circle_index_enabled and not q and circle_index.is_fresh():
+        circles = circle_index.query(
+            campus_id=campus_id, category=category, limit=limit, offset=offset
+        )
+        if fields is None:
+            return circles
+        return JSONResponse(
+            jsonable_encoder([{field: row[field] for field in fields} for row in circles])
+        )
+
+    circles = await circles_flight.do(
+        (campus_id, category, q, limit, offset, fields),
+        lambda: get_circles(
+            session=session,
+            campus_id=campus_id,
+            category=category,
+            search_query=q,
+            limit=limit,
+            offset=offset,
+            fields=fields,
+        ),
     )
+    if fields is not None:
+        # 一部のフィールドのみのため、Circle としての検証は行わずにそのまま返す
+        return JSONResponse(jsonable_encoder(circles))
     return circles
+
+
+@router.get(
+    "/recent",
+    response_model=list[Circle],
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Successful Response",
+            "headers": {
+                "Content-Encoding": {
+                    "description": "Accept-Encoding に応じた圧縮方式 (br / gzip)",
+                    "schema": {"type": "string"},
+                },
+                "Vary": {"description": "Accept-Encoding", "schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def list_recent_circles(
+    limit: int = Query(
+        settings.recent_circles_limit,
+        ge=1,
+        le=settings.recent_circles_limit,
+        description="取得件数 (トップページ表示用)",
+    ),
+    accept_encoding: str | None = Header(None),
+    session: AsyncSession = Depends(get_session),
+) -> Response:
+    """
+    最近更新されたサークルを取得する.
+
+    - サークル情報の編集・お知らせの公開を「更新」として扱う
+    - 公開されているサークルのみ返す
+    - 結果はサーバー側で短時間キャッシュされる (圧縮済みのボディをそのまま返す)
+    - レスポンスは response_model では検証しない (キャッシュ作成時に Circle から変換済み)
+    """
+    payload = await get_recent_circles_body(session=session, limit=limit)
+    return payload.to_response(accept_encoding)
+
+
+@router.get("/suggest", response_model=list[CircleSuggestion])
+async def suggest_circle_names(
+    prefix: str = Query(..., min_length=1, max_length=50, description="入力中のサークル名"),
+    limit: int = Query(10, ge=1, le=20, description="取得件数上限 (1-20、デフォルト: 10)"),
+    session: AsyncSession = Depends(get_session),
+) -> list[CircleSuggestion]:
+    """
+    サークル名の入力補完候補を取得する.
+
+    - 公開されているサークルのみ対象
+    - ひらがな/カタカナ・全角/半角・大文字/小文字の違いを無視して前方一致する
+    """
+    return await suggest_circles(session=session, prefix=prefix, limit=limit)
+
+
+@router.get(
+    "/{circle_id}",
+    response_model=Circle,
+    responses={404: {"description": "Circle not found"}},
+)
+async def read_circle(
+    circle_id: UUID,
+    response: Response,
+    fields: tuple[str, ...] | None = Depends(circle_fields),
+    session: AsyncSession = Depends(get_session),
+) -> Circle | Response:
+    """
+    サークル詳細を取得する.
+
+    - 公開されているサークルのみ返す (非公開・削除済みは 404)
+    - fields= を指定した場合は、指定したフィールドのみをDBから取得して返す
+    - ETag にサークルのバージョンを返す (更新時に If-Match で指定する)
+    """
+    # ETag を返すため、version は常に取得する
+    selected = fields if fields is None or "version" in fields else (*fields, "version")
+    circle = await get_circle(session=session, circle_id=circle_id, fields=selected)
+    if circle is None:
+        raise HTTPException(status_code=404, detail="Circle not found")
+    if fields is None:
+        response.headers["ETag"] = version_etag(circle.version)
+        return circle
+
+    headers = {"ETag": version_etag(circle["version"])}
+    if "version" not in fields:
+        del circle["version"]
+    return JSONResponse(jsonable_encoder(circle), headers=headers)
+
+
+@router.put(
+    "/{circle_id}",
+    response_model=Circle,
+    responses={
+        401: {"description": "Not authenticated"},
+        403: {"description": "Not allowed to edit this circle"},
+        404: {"description": "Circle not found"},
+        412: {"description": "Circle was modified by another request"},
+    },
+    dependencies=[Depends(require_circle_editor)],
+)
+async def put_circle(
+    circle_id: UUID,
+    response: Response,
+    data: CircleUpdate = Body(...),
+    if_match_header: str | None = Header(None, alias="If-Match"),
+    session: AsyncSession = Depends(get_session),
+) -> Circle:
+    """
+    サークル情報を更新する.
+
+    - 当該サークルの Leader / Editor、または SystemAdmin のみ実行できる
+    - 指定したフィールドのみ更新する (非公開のサークルも更新できる)
+    - If-Match に取得時の ETag を指定すると、その後に他の編集者が更新していた場合は 412 を返す
+      (412 には現在の ETag を付ける)
+    - 行ロックは使わないため、同時編集で待たされることはない
+    - OGP画像の再生成はバックグラウンドジョブ (ogp.render) で行う
+    """
+    circle = await get_circle_for_update(session=session, circle_id=circle_id)
+    if circle is None:
+        raise HTTPException(status_code=404, detail="Circle not found")
+    if not if_match(if_match_header, version_etag(circle.version)):
+        raise HTTPException(
+            status_code=412,
+            detail="Circle was modified by another request",
+            headers={"ETag": version_etag(circle.version)},
+        )
+
+    try:
+        circle = await update_circle(session=session, circle=circle, data=data)
+    except VersionConflictError as exc:
+        # 読み込み後に他のリクエストが更新した (ロールバック済み)。現在のバージョンを返す
+        current = await get_circle_for_update(session=session, circle_id=circle_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Circle not found") from exc
+        raise HTTPException(
+            status_code=412,
+            detail="Circle was modified by another request",
+            headers={"ETag": version_etag(current.version)},
+        ) from exc
+    # OGP画像は更新と同じトランザクションで登録したジョブで事前に再生成する
+    enqueue(session, "ogp.render", {"circle_id": str(circle.id)})
+    await session.commit()
+    response.headers["ETag"] = version_etag(circle.version)
+    return circle
+
+
+@router.get(
+    "/{circle_id}/ogp.png",
+    response_class=FileResponse,
+    responses={
+        200: {"content": {"image/png": {}}},
+        404: {"description": "Circle not found"},
+        503: {"description": "OGP image rendering is unavailable"},
+    },
+)
+async def get_circle_ogp_image(
+    circle_id: UUID,
+    if_none_match_header: str | None = Header(None, alias="If-None-Match"),
+    session: AsyncSession = Depends(get_session),
+) -> Response:
+    """
+    サークル詳細ページ用のOGP画像 (1200x630 PNG) を取得する.
+
+    - サークル名・ロゴ・キャンパスを描画する
+    - 生成した画像はディスクにキャッシュされ、サークル情報かロゴが更新された場合のみ再生成される
+    - 日本語を描画できるフォントがなく、画像を生成できない場合は 503
+    """
+    circle = await get_circle(session=session, circle_id=circle_id)
+    if circle is None:
+        raise HTTPException(status_code=404, detail="Circle not found")
+
+    try:
+        path, key = await get_ogp_image(circle)
+    except OgpFontUnavailableError as exc:
+        logger.warning("Cannot render OGP image: %s", exc)
+        raise HTTPException(
+            status_code=503, detail="OGP image rendering is unavailable"
+        ) from exc
+    etag = f'"{key}"'
+    headers = {"Cache-Control": "public, max-age=3600", "ETag": etag}
+    if if_none_match(if_none_match_header, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/png", headers=headers)
+
+
+@router.put(
+    "/{circle_id}/members",
+    response_model=list[CircleMemberRead],
+    responses={
+        401: {"description": "Not authenticated"},
+        403: {"description": "Not allowed to edit this circle"},
+        404: {"description": "Circle not found"},
+    },
+    dependencies=[Depends(require_circle_editor)],
+)
+async def put_circle_members(
+    circle_id: UUID,
+    roster: CircleRosterUpdate = Body(...),
+    session: AsyncSession = Depends(get_session),
+) -> list[CircleMemberRead]:
+    """
+    サークルの名簿を一括更新する.
+
+    - 当該サークルの Leader / Editor、または SystemAdmin のみ実行できる
+    - members を指定した場合は名簿全体を置き換える (含まれないメンバーは脱退)
+    - upsert / remove を指定した場合は差分のみ反映する
+    - メンバーはメールアドレスで指定する (存在しないユーザー・ロールが含まれる場合は 422)
+    - 更新後に代表者 (leader) が1人もいなくなる場合は 422 (何も変更しない)
+    - すべての変更は1トランザクションで反映される
+    """
+    try:
+        members = await update_circle_roster(session=session, circle_id=circle_id, roster=roster)
+    except RosterError as exc:
+        await session.rollback()
+        raise HTTPException(
+            status_code=422, detail={"message": str(exc), "values": exc.values}
+        ) from exc
+    if members is None:
+        raise HTTPException(status_code=404, detail="Circle not found")
+    await session.commit()
+    return members
@@ -0,0 +1,49 @@
+"""Change feed endpoints."""
+import asyncio
+from collections.abc import AsyncGenerator
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.change_feed import change_feed
+
+router = APIRouter()
+
+
+@router.get("", response_class=StreamingResponse)
+async def stream_events(request: Request) -> StreamingResponse:
+    """
+    サークル・お知らせの変更を Server-Sent Events で配信する.
+
+    - イベント名は `circle` または `announcement`
+    - データは `{"entity", "op", "id", ...}` 形式の JSON (内容は API から再取得する)
+    - 受信が追いつかないクライアントは切断される (EventSource が自動で再接続する)
+    """
+    subscription = change_feed.subscribe()
+
+    async def event_stream() -> AsyncGenerator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscription.get(), timeout=settings.sse_heartbeat_seconds
+                    )
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # プロキシにコネクションを切られないよう、定期的にコメント行を送る
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
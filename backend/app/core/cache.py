@@ -0,0 +1,61 @@
+"""In-process cache utilities."""
+import time
+import weakref
+from collections.abc import Hashable
+from typing import Any
+
+
+class TTLCache:
+    """
+    有効期限付きのプロセス内キャッシュ.
+
+    ワーカープロセスごとに保持される小さなキャッシュ。
+    値として None は保存できない (get の戻り値 None はキャッシュミスを意味する)。
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int = 1024) -> None:
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, tuple[float, Any]] = {}
+        _caches.add(self)
+
+    def get(self, key: Hashable) -> Any | None:
+        """キーに対応する値を返す (期限切れ・未登録の場合は None)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """値を保存する (上限に達した場合は最も古いエントリを破棄)."""
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # dict は挿入順を保持するため、先頭が最も古いエントリ
+            oldest = next(iter(self._entries))
+            del self._entries[oldest]
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def delete(self, key: Hashable) -> None:
+        """キーに対応する値を破棄する."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """全てのエントリを破棄する."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 生成済みキャッシュの一覧 (一括クリア用)
+_caches: weakref.WeakSet[TTLCache] = weakref.WeakSet()
+
+
+def clear_all_caches() -> None:
+    """プロセス内の全てのキャッシュを破棄する."""
+    for cache in list(_caches):
+        cache.clear()
@@ -0,0 +1,184 @@
+"""Negotiated gzip / brotli response compression."""
+import gzip
+from dataclasses import dataclass, field
+from typing import Self
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# 圧縮対象のメディアタイプ (画像等の圧縮済み形式と SSE は対象外)
+COMPRESSIBLE_MEDIA_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/plain",
+)
+# 圧縮率が同程度なら brotli を優先する
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """指定した方式でボディを圧縮する."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_level)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def select_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Accept-Encoding から使用する圧縮方式を決める.
+
+    q 値の最も大きい対応方式を返す (同じ q 値なら SUPPORTED_ENCODINGS の順)。
+    対応方式がない場合は None (無圧縮)。
+    """
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _is_compressible(headers: Headers) -> bool:
+    """圧縮対象のレスポンスかどうか."""
+    if "content-encoding" in headers:
+        return False
+    media_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return media_type in COMPRESSIBLE_MEDIA_TYPES
+
+
+@dataclass(frozen=True)
+class CompressedBody:
+    """
+    圧縮済みのレスポンスボディ.
+
+    キャッシュに保存し、ヒットするたびに圧縮し直さずに済むようにする。
+    compression_minimum_size 未満のボディは圧縮しない。
+    """
+
+    body: bytes
+    media_type: str = "application/json"
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str = "application/json") -> Self:
+        """対応するすべての方式で圧縮しておく."""
+        variants = {}
+        if len(body) >= settings.compression_minimum_size:
+            variants = {encoding: compress(body, encoding) for encoding in SUPPORTED_ENCODINGS}
+        return cls(body=body, media_type=media_type, variants=variants)
+
+    def to_response(self, accept_encoding: str | None) -> Response:
+        """クライアントが対応する方式のボディでレスポンスを作成する."""
+        encoding = select_encoding(accept_encoding) if self.variants else None
+        if encoding is None:
+            response = Response(self.body, media_type=self.media_type)
+        else:
+            response = Response(
+                self.variants[encoding],
+                media_type=self.media_type,
+                headers={"Content-Encoding": encoding},
+            )
+        if self.variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding に応じて gzip / brotli でレスポンスを圧縮するミドルウェア.
+
+    - ボディが compression_minimum_size バイト未満のレスポンスは圧縮しない
+    - Content-Encoding が設定済みのレスポンス (CompressedBody 等) はそのまま返す
+    - JSON・テキスト以外 (画像、SSE 等) はバッファリングせずにそのまま返す
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int | None = None) -> None:
+        self.app = app
+        self.minimum_size = (
+            settings.compression_minimum_size if minimum_size is None else minimum_size
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+    """1リクエスト分のレスポンスを圧縮して送信する."""
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.chunks: list[bytes] = []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_length = headers.get("content-length")
+            self.passthrough = not _is_compressible(headers) or (
+                content_length is not None and int(content_length) < self.minimum_size
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # ボディの大きさが分かるまで開始メッセージを保留する
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+
+        body = b"".join(self.chunks)
+        assert self.start_message is not None
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if len(body) >= self.minimum_size:
+            body = compress(body, self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": body})
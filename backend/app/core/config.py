@@ -1,4 +1,6 @@
 """Core configuration settings."""
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -27,9 +29,94 @@ class Settings(BaseSettings):
     # CORS
     cors_origins: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
+    # Rate limiting (クライアントIPごと)
+    # リバースプロキシの背後では全リクエストの接続元がプロキシになるため、既定では無効。
+    # 有効にする場合は rate_limit_client_ip_header と rate_limit_trusted_proxies を設定する
+    rate_limit_enabled: bool = False
+    # バケットの保存先 (local: ワーカー内メモリ / postgres: 全ワーカーで共有)
+    rate_limit_backend: Literal["local", "postgres"] = "local"
+    # クライアントIPを示すヘッダー (X-Forwarded-For / X-Real-IP 等)。未指定の場合は接続元
+    rate_limit_client_ip_header: str | None = None
+    # rate_limit_client_ip_header を信頼する接続元 (IPアドレスまたは CIDR)
+    rate_limit_trusted_proxies: list[str] = ["127.0.0.1", "::1"]
+    # postgres の場合にレート制限専用に張るDB接続数 (リクエスト用のプールとは別)
+    rate_limit_pool_size: int = 2
+    # "メソッド パス" (前方一致) → "1秒あたりのリクエスト数/バースト" (より長いパスが優先)
+    rate_limit_rules: dict[str, str] = {
+        "GET /api/v1/circles": "5/30",
+        "GET /api/v1/circles/suggest": "10/40",
+        "PUT /api/v1/circles": "1/10",
+        "* /api/v1": "10/50",
+    }
+
     # Static files
     static_dir: str = "./static"
     images_dir: str = "./static/images"
 
+    # 起動時 (lifespan) にテーブル作成・マスタデータ投入を行うか
+    # (python -m app.server では fork 前に親プロセスで1回だけ行い、ワーカーでは行わない)
+    db_init_on_startup: bool = True
+
+    # Pre-fork server (python -m app.server)
+    # ワーカー数 (未指定の場合は CPU 数)
+    server_workers: int | None = None
+    # ワーカーを入れ替えるまでの秒数 (0 の場合は入れ替えない)
+    server_worker_lifetime_seconds: float = 21600.0
+    server_worker_ready_timeout_seconds: float = 60.0
+    # 停止時に処理中のリクエストを待つ秒数 (経過後はワーカーを強制終了する)
+    server_graceful_timeout_seconds: float = 30.0
+    # 起動時にワーカーごとに張っておくDB接続数
+    server_warm_connections: int = 5
+
+    # OGP images
+    ogp_cache_dir: str = "./static/ogp"
+    # CJK フォント (Noto Sans CJK 等) のパス。未指定の場合は既知のパスから探す
+    # (日本語を描画できるフォントが見つからない場合、OGP画像のみ 503 になる)
+    ogp_font_path: str | None = None
+    ogp_render_workers: int = 2
+
+    # Response compression (gzip / brotli)
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    # brotli の既定値 (11) は動的な圧縮には重すぎるため、低めにしておく
+    compression_brotli_level: int = 5
+
+    # Recently updated circles (トップページ)
+    recent_circles_limit: int = 8
+    recent_circles_ttl_seconds: float = 30.0
+
+    # Master data (キャンパス・ロール)
+    master_data_ttl_seconds: float = 3600.0
+
+    # Circle name autocomplete
+    suggest_index_ttl_seconds: float = 300.0
+
+    # Circle columnar index (キーワードなしの一覧取得をメモリから応答する)
+    circle_index_enabled: bool = False
+    circle_index_refresh_seconds: float = 2.0
+    circle_index_max_staleness_seconds: float = 10.0
+    # 無効化通知がなくても全件を読み直す間隔 (通知しない書き込みを反映するため)
+    circle_index_full_refresh_seconds: float = 60.0
+
+    # Server-Sent Events (変更フィード)
+    sse_queue_size: int = 100
+    sse_heartbeat_seconds: float = 15.0
+
+    # Cache invalidation (ワーカー間)
+    cache_generation_poll_seconds: float = 5.0
+
+    # Background jobs (API プロセス内で実行する場合は job_worker_enabled を True にする)
+    job_worker_enabled: bool = False
+    job_worker_concurrency: int = 4
+    job_poll_seconds: float = 1.0
+    job_max_attempts: int = 5
+    job_retry_base_seconds: float = 10.0
+    job_retry_max_seconds: float = 3600.0
+    job_timeout_seconds: float = 300.0
+    # 実行中のまま この秒数を超えたジョブは、ワーカーが異常終了したとみなして実行待ちに戻す
+    job_stale_seconds: float = 600.0
+    # 完了 (成功・失敗) したジョブを保持する秒数 (過ぎたものはワーカーが削除する)
+    job_retention_seconds: float = 604800.0
+
 
 settings = Settings()
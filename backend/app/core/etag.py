@@ -0,0 +1,31 @@
+"""ETag helpers (conditional requests)."""
+
+
+def version_etag(version: int) -> str:
+    """行のバージョンから ETag を作成する."""
+    return f'"{version}"'
+
+
+def if_match(header: str | None, etag: str) -> bool:
+    """
+    If-Match の条件を満たすかどうか.
+
+    ヘッダーがない場合と `*` の場合は常に満たす。
+    If-Match は強い比較のため、弱い ETag (W/"...") は一致しない。
+    """
+    if header is None:
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """
+    If-None-Match に一致するかどうか (一致する場合は 304 を返す).
+
+    If-None-Match は弱い比較のため、W/ の有無は区別しない。`*` は常に一致する。
+    """
+    if header is None:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
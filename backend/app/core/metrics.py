@@ -0,0 +1,60 @@
+"""In-process metrics."""
+from collections.abc import Iterable
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class Counter:
+    """単調増加するカウンタ (ラベル付き)."""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """カウンタを加算する."""
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """現在の値を返す."""
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def samples(self) -> Iterable[tuple[LabelKey, float]]:
+        """(ラベル, 値) の組を返す."""
+        return self._values.items()
+
+
+class MetricsRegistry:
+    """
+    ワーカー内のメトリクスを保持するレジストリ.
+
+    値はプロセスごとに独立しているため、複数ワーカー構成では
+    収集側 (Prometheus 等) でワーカー単位に集計すること。
+    """
+
+    def __init__(self) -> None:
+        self._counters: dict[str, Counter] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        """カウンタを取得する (未登録の場合は作成する)."""
+        if name not in self._counters:
+            self._counters[name] = Counter(name, description)
+        return self._counters[name]
+
+    def render(self) -> str:
+        """Prometheus のテキスト形式で出力する."""
+        lines: list[str] = []
+        for counter in self._counters.values():
+            lines.append(f"# HELP {counter.name} {counter.description}")
+            lines.append(f"# TYPE {counter.name} counter")
+            for labels, value in counter.samples():
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{counter.name}{suffix} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# ワーカー内で共有するメトリクス
+metrics = MetricsRegistry()
@@ -0,0 +1,331 @@
+"""Per-route, per-client rate limiting (token bucket / GCRA)."""
+import ipaddress
+import json
+import logging
+import math
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Protocol
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests = metrics.counter(
+    "rate_limited_requests_total", "Number of requests rejected by the rate limiter"
+)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """
+    レート制限のルール.
+
+    1秒あたり rate 個のトークンが補充される、容量 burst のトークンバケットと同じ挙動になる。
+    """
+
+    name: str
+    method: str  # "*" は全メソッド
+    prefix: str
+    rate: float
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        """トークン1個が補充されるまでの秒数."""
+        return 1.0 / self.rate
+
+    def matches(self, method: str, path: str) -> bool:
+        """リクエストがこのルールの対象かどうか."""
+        if self.method != "*" and self.method != method:
+            return False
+        return path == self.prefix or path.startswith(self.prefix.rstrip("/") + "/")
+
+
+def parse_rules(rules: Mapping[str, str]) -> list[RateLimitRule]:
+    """
+    設定値からルールを作成する.
+
+    Args:
+        rules: "メソッド パス" → "1秒あたりのトークン数/バケットの容量"
+            (例: {"GET /api/v1/circles": "5/20"})
+
+    Returns:
+        パスの長い順 (より具体的なルールが先) に並べたルール
+    """
+    parsed = []
+    for target, limit in rules.items():
+        method, _, prefix = target.strip().partition(" ")
+        rate, _, burst = limit.partition("/")
+        rule = RateLimitRule(
+            name=target.strip(),
+            method=method.upper(),
+            prefix=prefix.strip(),
+            rate=float(rate),
+            burst=int(burst),
+        )
+        if not rule.prefix.startswith("/") or rule.rate <= 0 or rule.burst < 1:
+            raise ValueError(f"Invalid rate limit rule: {target!r}: {limit!r}")
+        parsed.append(rule)
+    return sorted(parsed, key=lambda rule: (len(rule.prefix), rule.method != "*"), reverse=True)
+
+
+def find_rule(rules: Iterable[RateLimitRule], method: str, path: str) -> RateLimitRule | None:
+    """リクエストに適用するルールを探す (最初に一致したもの)."""
+    return next((rule for rule in rules if rule.matches(method, path)), None)
+
+
+def gcra(tat: float, now: float, rule: RateLimitRule) -> tuple[float, float]:
+    """
+    GCRA でトークンを1個消費できるか判定する.
+
+    Args:
+        tat: バケットの理論到着時刻 (未使用のバケットは now 以下の値)
+        now: 現在時刻
+        rule: 適用するルール
+
+    Returns:
+        (許可した場合の新しい TAT, 拒否した場合の待ち時間 (許可した場合は 0))
+    """
+    new_tat = max(tat, now) + rule.interval
+    allow_at = new_tat - rule.burst * rule.interval
+    return new_tat, max(allow_at - now, 0.0)
+
+
+class BucketStore(Protocol):
+    """バケットの保存先."""
+
+    async def take(self, key: str, rule: RateLimitRule) -> float:
+        """
+        トークンを1個消費する.
+
+        Returns:
+            許可した場合は 0、拒否した場合は次にトークンが使えるまでの秒数
+        """
+        ...
+
+    def clear(self) -> None:
+        """全てのバケットを破棄する."""
+        ...
+
+    async def close(self) -> None:
+        """DB接続等を閉じる."""
+        ...
+
+
+class ExpiringTimes:
+    """
+    キー → 時刻 の小さな辞書 (時刻を過ぎたエントリは破棄される).
+
+    更新のたびにエントリを末尾へ移すため、先頭から期限切れのエントリを順に捨てられる。
+    上限を超えた場合は、最も長く更新されていないエントリから捨てる。
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._times: dict[str, float] = {}
+
+    def get(self, key: str, now: float) -> float | None:
+        """有効な時刻を返す (期限切れ・未登録の場合は None)."""
+        value = self._times.get(key)
+        return value if value is not None and value > now else None
+
+    def set(self, key: str, value: float, now: float) -> None:
+        """時刻を保存し、先頭から期限切れのエントリを破棄する."""
+        self._times.pop(key, None)
+        self._times[key] = value
+        while self._times:
+            oldest_key = next(iter(self._times))
+            if self._times[oldest_key] > now and len(self._times) <= self.max_entries:
+                break
+            del self._times[oldest_key]
+
+    def clear(self) -> None:
+        """全てのエントリを破棄する."""
+        self._times.clear()
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+
+class LocalBucketStore:
+    """
+    ワーカー内メモリのバケット.
+
+    GCRA によりバケットごとに理論到着時刻 (TAT) を1つだけ保持する。
+    TAT が現在時刻を過ぎたバケットは満タンと同じなので破棄する。
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self._tats = ExpiringTimes(max_entries)
+
+    async def take(self, key: str, rule: RateLimitRule) -> float:
+        now = time.monotonic()
+        new_tat, retry_after = gcra(self._tats.get(key, now) or now, now, rule)
+        if retry_after > 0:
+            return retry_after
+        self._tats.set(key, new_tat, now)
+        return 0.0
+
+    def clear(self) -> None:
+        self._tats.clear()
+
+    async def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# バケットの行をロックし、最新の TAT と現在時刻を返す (未使用のバケットは TAT = 0 で作成する).
+# ON CONFLICT DO UPDATE は文の開始時点のスナップショットではなく、他のトランザクションが
+# コミットした最新の行に対して実行されるため、同時に判定しても古い TAT で判定することはない。
+_LOCK_SQL = text(
+    """
+    INSERT INTO rate_limit_buckets AS b (key, tat) VALUES (:key, 0)
+    ON CONFLICT (key) DO UPDATE SET tat = b.tat
+    RETURNING b.tat, extract(epoch FROM clock_timestamp())::float8
+    """
+)
+_UPDATE_SQL = text("UPDATE rate_limit_buckets SET tat = :tat WHERE key = :key")
+_PURGE_SQL = text(
+    "DELETE FROM rate_limit_buckets WHERE tat < extract(epoch FROM clock_timestamp())"
+)
+
+
+class PostgresBucketStore:
+    """
+    Postgres に保存するバケット (全ワーカーで共有).
+
+    バケットの行をロックして最新の TAT を読み、許可した場合のみ同じトランザクションで
+    TAT を進める。拒否したクライアントは待ち時間が過ぎるまでワーカー内で拒否し続けるため、
+    制限中のクライアントがDBに負荷をかけることはない。
+
+    リクエスト用のコネクションプールとは別の小さなプールを使う (判定がリクエストの
+    DB接続を奪わないようにするため)。DBに接続できない場合やプールが空かない場合は
+    制限せずに通す。
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: int = 2,
+        pool_timeout: float = 1.0,
+        purge_interval: float = 60.0,
+        max_blocked: int = 100_000,
+    ) -> None:
+        self.engine = create_async_engine(
+            database_url, pool_size=pool_size, max_overflow=0, pool_timeout=pool_timeout
+        )
+        self.purge_interval = purge_interval
+        self._blocked = ExpiringTimes(max_blocked)
+        self._next_purge = time.monotonic() + purge_interval
+
+    async def take(self, key: str, rule: RateLimitRule) -> float:
+        now = time.monotonic()
+        blocked_until = self._blocked.get(key, now)
+        if blocked_until is not None:
+            return blocked_until - now
+
+        try:
+            async with self.engine.begin() as connection:
+                tat, db_now = (await connection.execute(_LOCK_SQL, {"key": key})).one()
+                new_tat, retry_after = gcra(tat, db_now, rule)
+                if retry_after <= 0:
+                    await connection.execute(_UPDATE_SQL, {"key": key, "tat": new_tat})
+                if now >= self._next_purge:
+                    # 満タンに戻ったバケットを削除する
+                    self._next_purge = now + self.purge_interval
+                    await connection.execute(_PURGE_SQL)
+        except (SQLAlchemyError, OSError):
+            logger.exception("Rate limit check failed; allowing request")
+            return 0.0
+
+        if retry_after > 0:
+            self._blocked.set(key, now + retry_after, now)
+        return retry_after
+
+    def clear(self) -> None:
+        self._blocked.clear()
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+
+class RateLimitMiddleware:
+    """
+    ルート・クライアントIPごとにリクエスト数を制限するミドルウェア.
+
+    ルーティングやDBアクセスの前に判定し、上限を超えたリクエストには
+    429 Too Many Requests と Retry-After を返す。
+
+    クライアントIPは接続元のアドレスとする。client_ip_header を指定した場合、
+    接続元が trusted_proxies のいずれかに含まれるときに限り、そのヘッダーの値
+    (X-Forwarded-For のように複数ある場合は、信頼するプロキシが追加した末尾の値) を使う。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: list[RateLimitRule],
+        store: BucketStore,
+        client_ip_header: str | None = None,
+        trusted_proxies: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.rules = rules
+        self.store = store
+        self.client_ip_header = client_ip_header
+        self.trusted_proxies = [ipaddress.ip_network(proxy) for proxy in trusted_proxies]
+
+    def client_ip(self, scope: Scope) -> str:
+        """レート制限のキーに使うクライアントIP."""
+        client = scope.get("client")
+        peer = client[0] if client else "unknown"
+        if self.client_ip_header is None or not self._is_trusted(peer):
+            return peer
+        forwarded = Headers(scope=scope).get(self.client_ip_header, "")
+        return forwarded.rsplit(",", 1)[-1].strip() or peer
+
+    def _is_trusted(self, peer: str) -> bool:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = find_rule(self.rules, scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.store.take(f"{rule.name}|{self.client_ip(scope)}", rule)
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limited_requests.inc(rule=rule.name)
+        body = json.dumps({"detail": "Too Many Requests"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
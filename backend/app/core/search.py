@@ -0,0 +1,20 @@
+"""Search text normalization."""
+import unicodedata
+
+# カタカナ (ァ-ヶ) とひらがな (ぁ-ゖ) のコードポイントの差
+_KANA_OFFSET = ord("ァ") - ord("ぁ")
+_KATAKANA_TO_HIRAGANA = {code: code - _KANA_OFFSET for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize_search_key(text: str) -> str:
+    """
+    検索用の正規化キーを作成する.
+
+    - NFKC 正規化 (全角英数→半角、半角カナ→全角カナ 等)
+    - カタカナをひらがなに統一
+    - 英字を小文字に統一
+
+    例: "ﾘﾅｯｸｽ Ｃｌｕｂ" → "りなっくす club"
+    """
+    normalized = unicodedata.normalize("NFKC", text)
+    return normalized.translate(_KATAKANA_TO_HIRAGANA).casefold().strip()
@@ -0,0 +1,39 @@
+"""Access token helpers."""
+from datetime import UTC, datetime, timedelta
+
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+
+def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
+    """
+    アクセストークン (JWT) を発行する.
+
+    Args:
+        subject: 認証基盤のユーザーID (User.auth_user_id)
+        expires_delta: 有効期間 (省略時は settings.access_token_expire_minutes)
+
+    Returns:
+        署名済みのトークン
+    """
+    expire = datetime.now(UTC) + (
+        expires_delta or timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    return jwt.encode(
+        {"sub": subject, "exp": expire}, settings.secret_key, algorithm=settings.algorithm
+    )
+
+
+def decode_access_token(token: str) -> str | None:
+    """
+    アクセストークンを検証し、subject を返す.
+
+    署名が不正・期限切れ・subject がない場合は None。
+    """
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return subject if isinstance(subject, str) and subject else None
@@ -0,0 +1,77 @@
+"""Request coalescing (single-flight) for concurrent identical calls."""
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from app.core.metrics import metrics
+
+coalesced_requests = metrics.counter(
+    "singleflight_coalesced_total",
+    "Number of calls that shared the result of an in-flight identical call",
+)
+
+
+class SingleFlight:
+    """
+    同一キーの同時呼び出しを1回の実行にまとめる.
+
+    最初の呼び出し (リーダー) だけが処理を実行し、実行中に来た同じキーの呼び出しは
+    その結果 (または例外) を共有する。結果はキャッシュしないため、完了後の呼び出しは
+    再び処理を実行する。
+
+    - リーダーがキャンセルされた場合は実行中の処理もキャンセルし、待機中の呼び出しは
+      新しいリーダーとして処理をやり直す (処理がリーダーのDBセッションを使うため)
+    - 待機中の呼び出しがキャンセルされても、実行中の処理には影響しない
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._flights: dict[Hashable, asyncio.Future[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        キーに対応する処理を実行する (同じキーが実行中であればその結果を待つ).
+
+        Args:
+            key: 呼び出しを識別するキー (同じ結果になる呼び出しは同じキーにする)
+            fn: 実行する処理
+
+        Returns:
+            処理の結果
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is None or flight.cancelled():
+                return await self._lead(key, fn)
+
+            coalesced_requests.inc(name=self.name)
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if flight.cancelled() and (current is None or current.cancelling() == 0):
+                    # リーダーが離脱しただけなので、自分がリーダーになってやり直す
+                    continue
+                raise
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """リーダーとして処理を実行する."""
+        flight = asyncio.ensure_future(fn())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._forget(key, done))
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+
+    def _forget(self, key: Hashable, flight: asyncio.Future[Any]) -> None:
+        """完了した処理を登録から外す."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # 待機者がいない場合に "exception was never retrieved" 警告が出ないようにする
+            flight.exception()
+
+    def __len__(self) -> int:
+        return len(self._flights)
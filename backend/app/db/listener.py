@@ -0,0 +1,114 @@
+"""PostgreSQL LISTEN connection management."""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+NotificationCallback = Callable[[str], None]
+ReconnectCallback = Callable[[], Awaitable[None]]
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """SQLAlchemy 形式のURLを asyncpg が解釈できるDSNに変換する."""
+    url = make_url(database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class PgListener:
+    """
+    ワーカーごとに1本だけ保持する LISTEN 専用コネクション.
+
+    リクエスト用のコネクションプールとは別に接続し、受信した通知を
+    チャンネルごとに登録されたコールバックへ配送する。
+    接続が切れた場合は自動的に再接続する。
+    """
+
+    def __init__(self, dsn: str, reconnect_interval: float = 1.0) -> None:
+        self.dsn = dsn
+        self.reconnect_interval = reconnect_interval
+        self._channels: dict[str, list[NotificationCallback]] = {}
+        self._reconnect_callbacks: list[ReconnectCallback] = []
+        self._connection: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+        self._ready = asyncio.Event()
+
+    def add_channel(self, channel: str, callback: NotificationCallback) -> None:
+        """チャンネルと受信時のコールバックを登録する (start 前に呼び出すこと)."""
+        self._channels.setdefault(channel, []).append(callback)
+
+    def add_reconnect_callback(self, callback: ReconnectCallback) -> None:
+        """(再)接続直後に呼び出すコールバックを登録する (切断中に取りこぼした通知の補完用)."""
+        self._reconnect_callbacks.append(callback)
+
+    @property
+    def is_connected(self) -> bool:
+        """LISTEN コネクションが有効かどうか."""
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self) -> None:
+        """バックグラウンドで LISTEN を開始する."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pg-listener")
+
+    async def wait_ready(self, timeout: float | None = None) -> None:
+        """最初の LISTEN が完了するまで待つ."""
+        await asyncio.wait_for(self._ready.wait(), timeout)
+
+    async def stop(self) -> None:
+        """LISTEN を停止し、コネクションを閉じる."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        self._ready.clear()
+
+    async def _run(self) -> None:
+        """接続・LISTEN・切断検知・再接続を繰り返す."""
+        while True:
+            terminated = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(self.dsn)
+                self._connection.add_termination_listener(lambda _conn: terminated.set())
+                for channel in self._channels:
+                    await self._connection.add_listener(channel, self._dispatch)
+                for callback in self._reconnect_callbacks:
+                    await callback()
+                self._ready.set()
+                logger.info("Listening on channels: %s", ", ".join(self._channels))
+                await terminated.wait()
+                logger.warning("LISTEN connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to establish LISTEN connection")
+            finally:
+                if self._connection is not None and not self._connection.is_closed():
+                    self._connection.terminate()
+                self._connection = None
+            await asyncio.sleep(self.reconnect_interval)
+
+    def _dispatch(
+        self, _connection: asyncpg.Connection, _pid: int, channel: str, payload: str
+    ) -> None:
+        """受信した通知をコールバックへ配送する."""
+        for callback in self._channels.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Notification callback failed on channel %s", channel)
+
+
+# ワーカー内で共有する LISTEN コネクション (起動・停止は lifespan で行う)
+pg_listener = PgListener(asyncpg_dsn(settings.database_url))
@@ -0,0 +1,38 @@
+"""既存のテーブルに version・name_search_key カラムを追加する
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+create_all はテーブルを作成するだけで、既存のテーブルにカラムを追加しないため、
+これらのカラムを追加する前に作成されたデータベースに追加する。
+create_all で作成したばかりのテーブルには既にあるため、IF NOT EXISTS を付ける。
+既存のサークルの name_search_key は、起動時に backfill_name_search_keys が設定する。
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+revision: str = "0001"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# 楽観的排他制御用のバージョン
+VERSIONED_TABLES = ("circles", "announcements")
+
+
+def upgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"
+        )
+    op.execute(
+        "ALTER TABLE circles ADD COLUMN IF NOT EXISTS name_search_key VARCHAR NOT NULL DEFAULT ''"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE circles DROP COLUMN IF EXISTS name_search_key")
+    for table in VERSIONED_TABLES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS version")
@@ -1,7 +1,12 @@
 """Database session management."""
 import logging
 from collections.abc import AsyncGenerator
+from pathlib import Path
 
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -25,14 +30,33 @@ async_session = sessionmaker(
     expire_on_commit=False,
 )
 
+# マイグレーションスクリプトの場所 (backend/alembic.ini からも参照する)
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """
+    既存のテーブルにスキーマの変更を適用する (alembic upgrade head).
+
+    create_all は既存のテーブルを変更しないため、カラムの追加等はマイグレーションで行う。
+    """
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
 
 async def init_db() -> None:
     """Initialize database tables and master data."""
     async with engine.begin() as conn:
+        # 複数のプロセスが同時に初期化しても、スキーマの変更は1つずつ適用する
+        await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('circleportal_schema'))"))
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
 
     # マスタデータの初期投入
     from app.db.init_data import init_master_data
+    from app.services.circle import backfill_name_search_keys
 
     async with async_session() as session:
         try:
@@ -41,6 +65,13 @@ async def init_db() -> None:
             # マスタデータが既に存在する場合はスキップ
             logger.debug("Master data already exists in database, skipping initialization")
 
+    # 検索キーを追加する前から存在するサークルに、検索キーを設定する
+    async with async_session() as session:
+        count = await backfill_name_search_keys(session)
+        await session.commit()
+    if count:
+        logger.info("Backfilled name_search_key for %d circles", count)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
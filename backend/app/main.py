@@ -1,22 +1,62 @@
 """Main FastAPI application."""
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.api import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.ratelimit import (
+    BucketStore,
+    LocalBucketStore,
+    PostgresBucketStore,
+    RateLimitMiddleware,
+    parse_rules,
+)
+from app.db.listener import pg_listener
 from app.db.session import init_db
+from app.services.circle_index import circle_index
+from app.services.invalidation import invalidation_bus
+from app.services.jobs import JobWorker, load_handlers
+from app.services.ogp import OgpFontUnavailableError, check_ogp_font, shutdown_ogp_renderer
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
-    await init_db()
+    # 日本語を描画できるフォントがない場合も起動は続け、OGP画像のみ 503 を返す
+    try:
+        check_ogp_font()
+    except OgpFontUnavailableError as exc:
+        logger.warning("OGP images are unavailable: %s", exc)
+    if settings.db_init_on_startup:
+        await init_db()
+    # ワーカーごとに1本の LISTEN コネクションを張る (変更フィード等)
+    await pg_listener.start()
+    await invalidation_bus.start()
+    if settings.circle_index_enabled:
+        await circle_index.start()
+    job_worker = JobWorker(handlers=load_handlers()) if settings.job_worker_enabled else None
+    if job_worker is not None:
+        await job_worker.start()
     yield
     # Shutdown
+    if job_worker is not None:
+        await job_worker.stop()
+    await circle_index.stop()
+    await invalidation_bus.stop()
+    await pg_listener.stop()
+    if rate_limit_store is not None:
+        await rate_limit_store.close()
+    shutdown_ogp_renderer()
 
 
 app = FastAPI(
@@ -25,6 +65,22 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Rate limiting (ルーティング・DBアクセスより前に判定する。429 にも CORS ヘッダーを付ける)
+rate_limit_store: BucketStore | None = None
+if settings.rate_limit_enabled:
+    rate_limit_store = (
+        PostgresBucketStore(settings.database_url, pool_size=settings.rate_limit_pool_size)
+        if settings.rate_limit_backend == "postgres"
+        else LocalBucketStore()
+    )
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=parse_rules(settings.rate_limit_rules),
+        store=rate_limit_store,
+        client_ip_header=settings.rate_limit_client_ip_header,
+        trusted_proxies=settings.rate_limit_trusted_proxies,
+    )
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +90,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression (gzip / brotli)
+app.add_middleware(CompressionMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory=settings.static_dir), name="static")
 
@@ -58,3 +117,9 @@ if settings.debug:
 async def health():
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Metrics endpoint (Prometheus text format, per worker)."""
+    return metrics.render()
@@ -1,18 +1,40 @@
 """Database models initialization."""
+from app.models.activity import CircleActivity
 from app.models.announcement import Announcement
-from app.models.circle import Circle, CircleMember
-from app.models.enums import AnnouncementType, CircleCategory
+from app.models.cache import CACHE_GENERATION_SEQUENCES
+from app.models.circle import (
+    Circle,
+    CircleMember,
+    CircleMemberEntry,
+    CircleMemberRead,
+    CircleRosterUpdate,
+    CircleSuggestion,
+    CircleUpdate,
+)
+from app.models.enums import AnnouncementType, CircleCategory, JobStatus
+from app.models.job import Job
 from app.models.master import Campus, CircleRole, SystemRole
+from app.models.ratelimit import RateLimitBucket
 from app.models.user import User
 
 __all__ = [
     "User",
     "Circle",
     "CircleMember",
+    "CircleSuggestion",
+    "CircleUpdate",
+    "CircleMemberEntry",
+    "CircleMemberRead",
+    "CircleRosterUpdate",
+    "CircleActivity",
     "Announcement",
     "Campus",
     "CircleRole",
     "SystemRole",
+    "CACHE_GENERATION_SEQUENCES",
+    "Job",
+    "RateLimitBucket",
     "CircleCategory",
     "AnnouncementType",
+    "JobStatus",
 ]
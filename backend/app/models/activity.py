@@ -0,0 +1,26 @@
+"""Circle activity model."""
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import TIMESTAMP, Column, Index
+from sqlmodel import Field, SQLModel
+
+
+class CircleActivity(SQLModel, table=True):
+    """
+    サークルの最終活動日時 (マテリアライズ済みランキング).
+
+    サークル情報の編集・お知らせの公開が行われるたびに、書き込みと同じトランザクションで
+    差分更新される。トップページの「最近更新されたサークル」はこのテーブルから取得する。
+    """
+
+    __tablename__ = "circle_activities"
+    __table_args__ = (
+        Index("ix_circle_activities_last_activity_at", "last_activity_at"),
+    )
+
+    circle_id: UUID = Field(foreign_key="circles.id", primary_key=True)
+    last_activity_at: datetime = Field(
+        sa_column=Column(TIMESTAMP(timezone=True), nullable=False),
+        description="最終活動日時 (サークル編集・お知らせ公開)",
+    )
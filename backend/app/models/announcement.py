@@ -2,12 +2,16 @@
 from datetime import UTC, datetime
 from uuid import UUID, uuid7
 
-from sqlalchemy import Column, TIMESTAMP
+from sqlalchemy import Column, Integer, TIMESTAMP
 from sqlmodel import Field, SQLModel
 
 from app.models.enums import AnnouncementType
 
 
+# 楽観的排他制御用のバージョン (UPDATE のたびに SQLAlchemy が加算する)
+_announcement_version = Column("version", Integer, nullable=False, server_default="1")
+
+
 class Announcement(SQLModel, table=True):
     """
     お知らせモデル.
@@ -16,6 +20,7 @@ class Announcement(SQLModel, table=True):
     """
 
     __tablename__ = "announcements"
+    __mapper_args__ = {"version_id_col": _announcement_version}
 
     id: UUID = Field(default_factory=uuid7, primary_key=True)
     circle_id: UUID = Field(foreign_key="circles.id", index=True)
@@ -58,3 +63,4 @@ class Announcement(SQLModel, table=True):
         sa_column=Column(TIMESTAMP(timezone=True), nullable=True),
         description="論理削除",
     )
+    version: int = Field(default=1, sa_column=_announcement_version)
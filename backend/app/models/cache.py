@@ -0,0 +1,20 @@
+"""Cache generation sequences."""
+from sqlalchemy import Sequence
+from sqlmodel import SQLModel
+
+# 名前空間 (書き込み時に無効化されるキャッシュの単位)
+NAMESPACE_CIRCLES = "circles"  # サークル一覧・ランキング等 (キー: サークルID)
+NAMESPACE_ANNOUNCEMENTS = "announcements"  # お知らせ (キー: サークルID)
+NAMESPACE_MASTER = "master"  # マスタデータ (キー: テーブル名)
+
+# 名前空間ごとの世代番号.
+#
+# 書き込みのたびに同じトランザクションで nextval() する。シーケンスはトランザクションに
+# 参加せず行ロックも取らないため、同じ名前空間への書き込み同士が待ち合わせることはない
+# (ロールバックされた書き込みの分も番号は進むが、キャッシュを余分に破棄するだけで済む)。
+# 各ワーカーは定期的にこの値を確認し、無効化通知 (NOTIFY) を取りこぼしていた場合は
+# 該当する名前空間のキャッシュを破棄する。
+CACHE_GENERATION_SEQUENCES = {
+    namespace: Sequence(f"cache_generation_{namespace}", metadata=SQLModel.metadata)
+    for namespace in (NAMESPACE_CIRCLES, NAMESPACE_ANNOUNCEMENTS, NAMESPACE_MASTER)
+}
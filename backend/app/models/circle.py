@@ -1,20 +1,31 @@
 """Circle model."""
 from datetime import UTC, datetime
+from typing import Self
 from uuid import UUID, uuid7
 
-from sqlalchemy import Column, TIMESTAMP
+from pydantic import model_validator
+from sqlalchemy import Column, Integer, TIMESTAMP, event
 from sqlmodel import Field, SQLModel
 
+from app.core.search import normalize_search_key
 from app.models.enums import CircleCategory
 
 
+# 楽観的排他制御用のバージョン (UPDATE のたびに SQLAlchemy が加算する)
+_circle_version = Column("version", Integer, nullable=False, server_default="1")
+
+
 class Circle(SQLModel, table=True):
     """Circle model."""
 
     __tablename__ = "circles"
+    # 更新時に WHERE version = <読み込んだ値> を付け、他者の更新と競合したら StaleDataError
+    __mapper_args__ = {"version_id_col": _circle_version}
 
     id: UUID = Field(default_factory=uuid7, primary_key=True)
     name: str = Field(index=True)
+    # 検索用の正規化済みサークル名 (書き込み時に自動設定、APIレスポンスには含めない)
+    name_search_key: str = Field(default="", exclude=True)
     campus_id: int = Field(foreign_key="campuses.id", index=True)
     category: CircleCategory = Field(index=True)
     description: str = Field(default="")
@@ -38,6 +49,62 @@ class Circle(SQLModel, table=True):
     deleted_at: datetime | None = Field(
         default=None, sa_column=Column(TIMESTAMP(timezone=True), nullable=True)
     )
+    version: int = Field(default=1, sa_column=_circle_version)
+
+
+# fields= で指定できるフィールド (id は常に含める)
+CIRCLE_FIELDS = (
+    "id",
+    "name",
+    "campus_id",
+    "category",
+    "description",
+    "location",
+    "activity_detail",
+    "logo_url",
+    "cover_image_url",
+    "is_published",
+    "created_at",
+    "updated_at",
+    "deleted_at",
+    "version",
+)
+
+
+@event.listens_for(Circle, "before_insert")
+@event.listens_for(Circle, "before_update")
+def _update_name_search_key(mapper, connection, target: Circle) -> None:
+    """サークル名から検索用の正規化キーを設定する."""
+    target.name_search_key = normalize_search_key(target.name)
+
+
+class CircleUpdate(SQLModel):
+    """サークル情報の更新 (指定したフィールドのみ更新する)."""
+
+    name: str | None = Field(default=None, min_length=1, max_length=100)
+    campus_id: int | None = Field(default=None, ge=1, le=2)
+    category: CircleCategory | None = None
+    description: str | None = None
+    location: str | None = None
+    activity_detail: str | None = None
+    logo_url: str | None = None
+    cover_image_url: str | None = None
+    is_published: bool | None = None
+
+    @model_validator(mode="after")
+    def _reject_null(self) -> Self:
+        """NOT NULL のカラムに null を指定できないようにする."""
+        for field in ("name", "campus_id", "category", "description", "is_published"):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} cannot be null")
+        return self
+
+
+class CircleSuggestion(SQLModel):
+    """サークル名の入力補完候補."""
+
+    id: UUID
+    name: str
 
 
 class CircleMember(SQLModel, table=True):
@@ -53,3 +120,56 @@ class CircleMember(SQLModel, table=True):
     circle_id: UUID = Field(foreign_key="circles.id", primary_key=True)
     user_id: UUID = Field(foreign_key="users.id", primary_key=True)
     role_id: int = Field(foreign_key="circle_roles.id", index=True)
+
+
+# 1回の名簿更新で指定できるメンバー数の上限
+MAX_ROSTER_SIZE = 1000
+
+
+class CircleMemberEntry(SQLModel):
+    """名簿更新で指定するメンバー."""
+
+    email: str = Field(min_length=1, max_length=254, description="ユーザーのメールアドレス")
+    role: str = Field(default="member", description="サークルロールのコード (leader/editor/member)")
+
+
+class CircleRosterUpdate(SQLModel):
+    """
+    サークル名簿の一括更新.
+
+    members を指定した場合は名簿全体を置き換える (含まれないメンバーは脱退)。
+    members を省略した場合は upsert / remove を差分として適用する。
+    """
+
+    members: list[CircleMemberEntry] | None = Field(
+        default=None, max_length=MAX_ROSTER_SIZE, description="名簿全体"
+    )
+    upsert: list[CircleMemberEntry] = Field(
+        default_factory=list,
+        max_length=MAX_ROSTER_SIZE,
+        description="追加・ロール変更するメンバー",
+    )
+    remove: list[str] = Field(
+        default_factory=list,
+        max_length=MAX_ROSTER_SIZE,
+        description="脱退させるメンバーのメールアドレス",
+    )
+
+    @model_validator(mode="after")
+    def _check_entries(self) -> Self:
+        """全体指定と差分指定の併用、同じメールアドレスの重複指定を禁止する."""
+        if self.members is not None and (self.upsert or self.remove):
+            raise ValueError("members cannot be combined with upsert/remove")
+        emails = [entry.email for entry in self.members or self.upsert] + self.remove
+        if len(emails) != len(set(emails)):
+            raise ValueError("each email may appear only once")
+        return self
+
+
+class CircleMemberRead(SQLModel):
+    """サークルメンバー (名簿の表示用)."""
+
+    user_id: UUID
+    email: str
+    username: str
+    role: str
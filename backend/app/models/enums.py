@@ -15,3 +15,12 @@ class AnnouncementType(str, Enum):
 
     EVENT = "event"  # イベント
     NEWS = "news"  # ニュース
+
+
+class JobStatus(str, Enum):
+    """バックグラウンドジョブの状態."""
+
+    QUEUED = "queued"  # 実行待ち (リトライ待ちを含む)
+    RUNNING = "running"  # 実行中
+    SUCCEEDED = "succeeded"  # 成功
+    FAILED = "failed"  # 失敗 (リトライ上限に到達)
@@ -0,0 +1,73 @@
+"""Background job model."""
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import TIMESTAMP, BigInteger, Column, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+from app.models.enums import JobStatus
+
+
+class Job(SQLModel, table=True):
+    """
+    バックグラウンドジョブ.
+
+    ワーカーは `FOR UPDATE SKIP LOCKED` で実行待ちのジョブを1件ずつ確保する。
+    失敗したジョブは run_at を先送りして再度実行待ちに戻し、
+    max_attempts 回失敗した時点で failed とする。
+    完了したジョブは settings.job_retention_seconds 経過後にワーカーが削除する。
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # 実行待ちジョブの確保用 (優先度の高い順 → 実行予定日時の早い順)
+        Index(
+            "ix_jobs_queued",
+            text("priority DESC"),
+            "run_at",
+            "id",
+            postgresql_where=text("status = 'QUEUED'"),
+        ),
+        # 実行中のまま放置されたジョブの回収用
+        Index("ix_jobs_running", "locked_at", postgresql_where=text("status = 'RUNNING'")),
+        # 完了したジョブの削除用
+        Index(
+            "ix_jobs_finished",
+            "finished_at",
+            postgresql_where=text("status IN ('SUCCEEDED', 'FAILED')"),
+        ),
+    )
+
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, primary_key=True, autoincrement=True)
+    )
+    kind: str = Field(index=True, description="ジョブの種類 (ハンドラの登録名)")
+    payload: dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(JSONB, nullable=False), description="引数"
+    )
+    status: JobStatus = Field(default=JobStatus.QUEUED)
+    priority: int = Field(default=0, description="優先度 (大きいほど先に実行)")
+    attempts: int = Field(default=0, description="実行回数")
+    max_attempts: int = Field(default=5, description="最大実行回数")
+    run_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now()),
+        description="実行予定日時 (リトライ時は先送りされる)",
+    )
+    locked_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(TIMESTAMP(timezone=True), nullable=True),
+        description="ワーカーが確保した日時",
+    )
+    locked_by: str | None = Field(default=None, description="確保したワーカーの識別子")
+    last_error: str | None = Field(default=None, description="直近の失敗理由")
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now()),
+    )
+    finished_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(TIMESTAMP(timezone=True), nullable=True),
+        description="完了日時 (成功・失敗)",
+    )
@@ -0,0 +1,21 @@
+"""Rate limit bucket model."""
+from sqlalchemy import Column, Float
+from sqlmodel import Field, SQLModel
+
+
+class RateLimitBucket(SQLModel, table=True):
+    """
+    レート制限のバケット (ワーカー間で共有する場合のみ使用).
+
+    GCRA (Generic Cell Rate Algorithm) の理論到着時刻 (TAT) のみを保持する。
+    失われても制限が一時的に緩むだけのため、WAL を書かない UNLOGGED テーブルにする。
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: str = Field(primary_key=True, description="ルール名|クライアントIP")
+    tat: float = Field(
+        sa_column=Column(Float, nullable=False),
+        description="理論到着時刻 (UNIX 時刻、この時刻以降はバケットが満タン)",
+    )
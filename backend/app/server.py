@@ -0,0 +1,351 @@
+"""Pre-forking production server.
+
+アプリケーションの import、テーブル作成・マスタデータ投入 (init_db)、キャッシュの作成を
+親プロセスで1回だけ行い、その後ワーカープロセスを fork する
+(ワーカーは copy-on-write でメモリを共有する)::
+
+    uv run python -m app.server --port 8000
+
+ワーカーは一定時間ごとに1台ずつ入れ替える。新しいワーカーの起動が完了してから
+古いワーカーを停止するため、入れ替え中も処理能力は落ちず、起動直後の遅い応答も
+クライアントには届かない。
+
+親プロセスで作成したキャッシュの有効期限 (ランキング等は30秒) は fork 後も進むため、
+使えるのは起動直後のワーカーだけである。入れ替え・再起動で後から起動したワーカーは、
+起動完了を通知する前に自分でキャッシュを作り直す (serve_worker)。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import select
+import signal
+import socket
+import time
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass
+from typing import Any
+
+import uvicorn
+from starlette.types import ASGIApp
+
+from app.core.config import settings
+from app.db.session import engine, init_db
+from app.main import app
+from app.services.change_feed import change_feed
+from app.services.warmup import warm_caches, warm_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# ワーカープロセスで実行する関数 (待ち受けるソケット, 起動完了を通知する fd)
+WorkerMain = Callable[[socket.socket, int], Coroutine[Any, Any, None]]
+
+
+def default_worker_count() -> int:
+    """ワーカー数の既定値 (このプロセスが使える CPU 数)."""
+    return os.process_cpu_count() or 1
+
+
+def recycle_offsets(workers: int, lifetime: float) -> list[float]:
+    """
+    各ワーカーの初回の入れ替えまでの秒数.
+
+    入れ替えが同時に起きないよう、lifetime の間に均等にずらす。
+    """
+    return [lifetime * (slot + 1) / workers for slot in range(workers)]
+
+
+@dataclass
+class Worker:
+    """起動中のワーカープロセス."""
+
+    pid: int
+    slot: int
+    ready_fd: int
+    started_at: float
+    recycle_at: float
+    ready: bool = False
+    retiring: bool = False
+    # 停止を指示したワーカーを強制終了する時刻 (停止を指示していなければ None)
+    kill_at: float | None = None
+
+
+class PreforkServer:
+    """ワーカープロセスの起動・監視・入れ替えを行う親プロセス."""
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        workers: int,
+        lifetime: float,
+        ready_timeout: float,
+        graceful_timeout: float,
+        worker_main: WorkerMain | None = None,
+    ) -> None:
+        self.sock = sock
+        self.worker_main = worker_main or serve_worker
+        self.workers = workers
+        self.lifetime = lifetime
+        self.ready_timeout = ready_timeout
+        self.graceful_timeout = graceful_timeout
+        self._children: dict[int, Worker] = {}
+        # 入れ替え中のワーカー (新しいワーカー → 停止する古いワーカー)
+        self._replacing: dict[int, int] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        """全ワーカーを起動し、停止シグナルを受け取るまで監視する."""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        now = time.monotonic()
+        for slot, offset in enumerate(recycle_offsets(self.workers, self.lifetime)):
+            self._spawn(slot, now + offset)
+
+        while not self._stopping:
+            self._wait_ready(timeout=1.0)
+            self._reap()
+            self._recycle()
+        self._shutdown()
+
+    def _handle_stop(self, signum: int, frame: object) -> None:
+        self._stopping = True
+
+    def _spawn(self, slot: int, recycle_at: float) -> Worker:
+        """ワーカーを fork する."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                asyncio.run(self.worker_main(self.sock, write_fd))
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        os.close(write_fd)
+        worker = Worker(
+            pid=pid,
+            slot=slot,
+            ready_fd=read_fd,
+            started_at=time.monotonic(),
+            recycle_at=recycle_at,
+        )
+        self._children[pid] = worker
+        logger.info("Started worker %d (slot %d)", pid, slot)
+        return worker
+
+    def _wait_ready(self, timeout: float) -> None:
+        """起動完了の通知を受け取る."""
+        pending = {
+            worker.ready_fd: worker
+            for worker in self._children.values()
+            if not worker.ready and worker.ready_fd != -1
+        }
+        if not pending:
+            time.sleep(timeout)
+            return
+        try:
+            readable, _, _ = select.select(list(pending), [], [], timeout)
+        except InterruptedError:
+            return
+        for fd in readable:
+            worker = pending[fd]
+            if os.read(fd, 1):
+                worker.ready = True
+                logger.info("Worker %d is ready", worker.pid)
+                old_pid = self._replacing.pop(worker.pid, None)
+                if old_pid is not None:
+                    self._retire(old_pid)
+            # 起動に失敗したワーカー (EOF) は、終了を検知した時点で起動し直す
+            os.close(fd)
+            worker.ready_fd = -1
+
+    def _reap(self) -> None:
+        """終了したワーカーを回収し、予期せず終了した場合は起動し直す."""
+        while self._children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self._children.pop(pid, None)
+            if worker is None:
+                continue
+            if worker.ready_fd != -1:
+                os.close(worker.ready_fd)
+            if worker.retiring or self._stopping:
+                logger.info("Worker %d exited", pid)
+                continue
+
+            logger.warning("Worker %d exited unexpectedly (status %d)", pid, status)
+            # 入れ替え用に起動したワーカーが失敗した場合は、古いワーカーを使い続ける
+            old_pid = self._replacing.pop(pid, None)
+            if old_pid is not None and old_pid in self._children:
+                self._children[old_pid].recycle_at = time.monotonic() + self.ready_timeout
+                continue
+            if not worker.ready:
+                # 起動直後に終了を繰り返す場合に fork し続けないようにする
+                time.sleep(1.0)
+            self._spawn(worker.slot, time.monotonic() + self.lifetime)
+
+    def _recycle(self) -> None:
+        """入れ替え時刻を過ぎたワーカーを、1台ずつ新しいワーカーと入れ替える."""
+        now = time.monotonic()
+        for worker in self._children.values():
+            if worker.kill_at is not None and worker.kill_at <= now:
+                # graceful_timeout 以内に終了しないワーカーは強制終了する
+                logger.warning("Worker %d did not exit in time; killing", worker.pid)
+                worker.kill_at = None
+                try:
+                    os.kill(worker.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        for new_pid, old_pid in list(self._replacing.items()):
+            new = self._children.get(new_pid)
+            if new is not None and now - new.started_at > self.ready_timeout:
+                # 起動しないワーカーは諦め、古いワーカーを使い続けて後でやり直す
+                logger.warning("Worker %d did not become ready; keeping %d", new_pid, old_pid)
+                new.retiring = True
+                os.kill(new_pid, signal.SIGKILL)
+                del self._replacing[new_pid]
+                if old_pid in self._children:
+                    self._children[old_pid].recycle_at = now + self.ready_timeout
+        if self.lifetime <= 0 or self._replacing:
+            return
+
+        candidates = [
+            worker
+            for worker in self._children.values()
+            if worker.ready and not worker.retiring and worker.recycle_at <= now
+        ]
+        if candidates:
+            old = min(candidates, key=lambda worker: worker.recycle_at)
+            new = self._spawn(old.slot, now + self.lifetime)
+            self._replacing[new.pid] = old.pid
+
+    def _retire(self, pid: int) -> None:
+        """
+        ワーカーを停止する.
+
+        処理中のリクエストは完了させ、graceful_timeout 経過後も終了しない場合は
+        _recycle で強制終了する。
+        """
+        worker = self._children.get(pid)
+        if worker is None:
+            return
+        worker.retiring = True
+        worker.kill_at = time.monotonic() + self.graceful_timeout
+        logger.info("Recycling worker %d (slot %d)", pid, worker.slot)
+        os.kill(pid, signal.SIGTERM)
+
+    def _shutdown(self) -> None:
+        """全ワーカーを停止する (graceful_timeout 経過後は強制終了)."""
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._children):
+            logger.warning("Killing worker %d", pid)
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+        self._children.clear()
+
+
+async def serve_worker(sock: socket.socket, ready_fd: int) -> None:
+    """
+    ワーカープロセスで API を起動する.
+
+    接続プールとキャッシュを用意してから起動完了を ready_fd に通知する。
+    親プロセスで作成したキャッシュが有効であれば、それをそのまま使い、
+    期限切れのもの (入れ替えで後から起動したワーカー等) はここで作り直す。
+    """
+    await warm_connection_pool(settings.server_warm_connections)
+    await warm_caches()
+    await serve_app(app, sock, ready_fd)
+
+
+async def serve_app(asgi_app: ASGIApp, sock: socket.socket, ready_fd: int) -> None:
+    """
+    HTTP サーバーを起動し、リクエストを受け付けられるようになったら ready_fd に通知する.
+
+    停止時は、処理中のリクエストを server_graceful_timeout_seconds まで待つ。
+    終わりのない SSE のレスポンスは、停止が始まった時点で変更フィードの購読を終了して
+    完了させる (待ち続けると、入れ替えたワーカーがいつまでも終了しないため)。
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(
+            asgi_app,
+            lifespan="on",
+            proxy_headers=True,
+            log_config=None,
+            timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+        )
+    )
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started and not task.done():
+        await asyncio.sleep(0.05)
+    if server.started:
+        os.write(ready_fd, b"1")
+    os.close(ready_fd)
+    while not server.should_exit and not task.done():
+        await asyncio.sleep(0.1)
+    change_feed.close()
+    await task
+
+
+async def prepare() -> None:
+    """fork 前の準備 (テーブル作成・キャッシュ作成)."""
+    await init_db()
+    await warm_caches()
+    # DB接続は fork 先で共有できないため、作成したキャッシュだけを残して閉じる
+    await engine.dispose()
+
+
+def main() -> None:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.server_workers or default_worker_count(),
+        help="ワーカー数 (既定: CPU 数)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    asyncio.run(prepare())
+    # テーブル作成・マスタデータ投入は済んでいるため、各ワーカーの起動時には行わない
+    settings.db_init_on_startup = False
+
+    sock = socket.create_server((args.host, args.port), backlog=2048, reuse_port=False)
+    sock.set_inheritable(True)
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, args.workers)
+    PreforkServer(
+        sock,
+        workers=args.workers,
+        lifetime=settings.server_worker_lifetime_seconds,
+        ready_timeout=settings.server_worker_ready_timeout_seconds,
+        graceful_timeout=settings.server_graceful_timeout_seconds,
+    ).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
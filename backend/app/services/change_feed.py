@@ -0,0 +1,154 @@
+"""Circle and announcement change feed service."""
+import asyncio
+import json
+import logging
+from typing import Any
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, UOWTransaction
+
+from app.core.config import settings
+from app.db.listener import pg_listener
+from app.models.announcement import Announcement
+from app.models.circle import Circle
+
+logger = logging.getLogger(__name__)
+
+# 変更通知に使う NOTIFY チャンネル名
+CHANGE_CHANNEL = "circleportal_changes"
+
+
+class Subscription:
+    """
+    変更フィードの購読者1人分の受信キュー.
+
+    キューは有界で、溢れた場合は購読者ごと切り離される (遅いクライアントが
+    他の購読者や通知の受信処理を巻き込まないようにするため)。
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    async def get(self) -> str | None:
+        """次のイベントを待つ (切り離された場合は None)."""
+        return await self._queue.get()
+
+    def _offer(self, frame: str) -> bool:
+        """イベントをキューに積む (溢れた場合は False)."""
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def _close(self) -> None:
+        """未配送のイベントを破棄し、終了を通知する."""
+        self.dropped = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class ChangeFeed:
+    """LISTEN で受信した変更通知を、全ての購読者へ配信する."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self._closed = False
+
+    @property
+    def subscriber_count(self) -> int:
+        """現在の購読者数."""
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        """購読を開始する (close 後は、すぐに終了する購読を返す)."""
+        subscription = Subscription(self.queue_size)
+        if self._closed:
+            subscription._close()
+        else:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """購読を終了する."""
+        self._subscribers.discard(subscription)
+
+    def close(self) -> None:
+        """全ての購読を終了する (サーバーの停止時に、SSE のレスポンスを完了させる)."""
+        self._closed = True
+        for subscription in list(self._subscribers):
+            self.unsubscribe(subscription)
+            subscription._close()
+
+    def publish(self, payload: str) -> None:
+        """
+        NOTIFY のペイロードを Server-Sent Events 形式に変換して配信する.
+
+        フレームは1回だけ組み立て、全購読者で同じ文字列を共有する。
+        """
+        try:
+            entity = json.loads(payload)["entity"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed change notification: %r", payload)
+            return
+        frame = f"event: {entity}\ndata: {payload}\n\n"
+        for subscription in list(self._subscribers):
+            if not subscription._offer(frame):
+                logger.info("Dropping slow change feed subscriber")
+                self.unsubscribe(subscription)
+                subscription._close()
+
+
+# ワーカー内で共有する変更フィード
+change_feed = ChangeFeed(queue_size=settings.sse_queue_size)
+pg_listener.add_channel(CHANGE_CHANNEL, change_feed.publish)
+
+
+def _changed_payloads(session: Session) -> list[dict[str, Any]]:
+    """フラッシュ対象のオブジェクトから、通知すべき変更を集める."""
+    changes: list[dict[str, Any]] = []
+    targets = (("insert", session.new), ("update", session.dirty), ("delete", session.deleted))
+    for op, objects in targets:
+        for obj in objects:
+            if op == "update" and not session.is_modified(obj):
+                continue
+            if isinstance(obj, Circle):
+                # 非公開のままのサークルの変更は通知しない
+                was_published = True in inspect(obj).attrs.is_published.history.deleted
+                if obj.is_published or was_published:
+                    changes.append({"entity": "circle", "op": op, "id": str(obj.id)})
+            elif isinstance(obj, Announcement) and obj.published_at is not None:
+                changes.append(
+                    {
+                        "entity": "announcement",
+                        "op": op,
+                        "id": str(obj.id),
+                        "circle_id": str(obj.circle_id),
+                    }
+                )
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_changes(session: Session, flush_context: UOWTransaction) -> None:
+    """
+    サークル・お知らせの変更を NOTIFY で通知する.
+
+    NOTIFY はトランザクションのコミット時に配送され、ロールバック時には破棄される。
+    ペイロードには ID のみを含め、クライアントは必要に応じて API から再取得する。
+    フラッシュ内の変更は1つの SELECT pg_notify(...), pg_notify(...) にまとめて送る。
+    """
+    changes = _changed_payloads(session)
+    if not changes:
+        return
+    session.connection().execute(
+        select(
+            *(
+                func.pg_notify(CHANGE_CHANNEL, json.dumps(change, separators=(",", ":")))
+                for change in changes
+            )
+        )
+    )
@@ -1,11 +1,66 @@
 """Circle service layer."""
-from sqlalchemy import select
+from collections.abc import Sequence
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import Select, bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.models.circle import Circle
+from app.core.search import normalize_search_key
+from app.models.circle import Circle, CircleUpdate
 from app.models.enums import CircleCategory
 
 
+class VersionConflictError(Exception):
+    """更新対象が他のリクエストによって先に更新されていた."""
+
+
+async def backfill_name_search_keys(session: AsyncSession) -> int:
+    """
+    検索用の正規化キーが未設定のサークルに設定する (起動時に実行).
+
+    name_search_key は書き込み時に設定されるため、カラムを追加する前から存在する
+    サークルは空のままで、名前で検索できない (カラムはマイグレーションで追加する)。
+    サークルの更新としては扱わない (updated_at・version は変えず、無効化も通知しない)。
+
+    Returns:
+        設定したサークルの件数
+
+    Note:
+        コミットは呼び出し側で行う。
+    """
+    table = Circle.__table__
+    result = await session.execute(
+        select(table.c.id, table.c.name).where(table.c.name_search_key == "")
+    )
+    keys = [
+        {"circle_id": circle_id, "key": key}
+        for circle_id, name in result.all()
+        if (key := normalize_search_key(name))
+    ]
+    if keys:
+        await session.execute(
+            update(table)
+            .where(table.c.id == bindparam("circle_id"))
+            .values(name_search_key=bindparam("key"), updated_at=table.c.updated_at),
+            keys,
+        )
+    return len(keys)
+
+
+def _select_circles(fields: Sequence[str] | None) -> Select:
+    """取得するフィールドに応じて SELECT 文を作成する (省略時は全カラム)."""
+    if fields is None:
+        return select(Circle)
+    return select(*(getattr(Circle, field) for field in fields))
+
+
+def _escape_like(value: str) -> str:
+    """SQL LIKE のワイルドカード文字 (%, _) をエスケープする."""
+    return value.replace("%", r"\%").replace("_", r"\_")
+
+
 async def get_circles(
     session: AsyncSession,
     campus_id: int | None = None,
@@ -13,7 +68,8 @@ async def get_circles(
     search_query: str | None = None,
     limit: int = 20,
     offset: int = 0,
-) -> list[Circle]:
+    fields: Sequence[str] | None = None,
+) -> list[Circle] | list[dict[str, Any]]:
     """
     サークル一覧を取得する.
 
@@ -24,12 +80,16 @@ async def get_circles(
         search_query: 検索クエリ (optional、名前または説明文に含まれる)
         limit: 取得件数上限 (デフォルト: 20)
         offset: オフセット (デフォルト: 0)
+        fields: 取得するフィールド (optional、CIRCLE_FIELDS のいずれか)
 
     Returns:
         サークルのリスト (公開済み・削除されていないもののみ)
+        fields を指定した場合は、指定したカラムのみを SELECT した辞書のリスト
     """
     # 基本クエリ: 公開済み & 削除されていない
-    query = select(Circle).where(Circle.is_published.is_(True), Circle.deleted_at.is_(None))
+    query = _select_circles(fields).where(
+        Circle.is_published.is_(True), Circle.deleted_at.is_(None)
+    )
 
     # フィルタ適用
     if campus_id is not None:
@@ -38,11 +98,13 @@ async def get_circles(
         query = query.where(Circle.category == category)
     if search_query:
         # SQL LIKE のワイルドカード文字 (%, _) をエスケープ
-        search_escaped = search_query.replace("%", r"\%").replace("_", r"\_")
+        search_escaped = _escape_like(search_query)
         search_pattern = f"%{search_escaped}%"
+        # サークル名はひらがな/カタカナ・全角/半角の違いを無視して検索する
+        key_pattern = f"%{_escape_like(normalize_search_key(search_query))}%"
         query = query.where(
-            (Circle.name.ilike(search_pattern, escape="\\")) | 
-            (Circle.description.ilike(search_pattern, escape="\\"))
+            (Circle.name_search_key.like(key_pattern, escape="\\"))
+            | (Circle.description.ilike(search_pattern, escape="\\"))
         )
 
     # ソート適用 (作成日時の新しい順)
@@ -53,5 +115,84 @@ async def get_circles(
 
     # 実行
     result = await session.execute(query)
+    if fields is not None:
+        return [dict(row._mapping) for row in result.all()]
     circles = result.scalars().all()
     return list(circles)
+
+
+async def get_circle(
+    session: AsyncSession,
+    circle_id: UUID,
+    fields: Sequence[str] | None = None,
+) -> Circle | dict[str, Any] | None:
+    """
+    公開されているサークルを1件取得する.
+
+    Args:
+        session: データベースセッション
+        circle_id: サークルID
+        fields: 取得するフィールド (optional、CIRCLE_FIELDS のいずれか)
+
+    Returns:
+        サークル (存在しない・非公開・削除済みの場合は None)
+        fields を指定した場合は、指定したカラムのみを SELECT した辞書
+    """
+    query = _select_circles(fields).where(
+        Circle.id == circle_id,
+        Circle.is_published.is_(True),
+        Circle.deleted_at.is_(None),
+    )
+    result = await session.execute(query)
+    if fields is not None:
+        row = result.one_or_none()
+        return None if row is None else dict(row._mapping)
+    return result.scalar_one_or_none()
+
+
+async def get_circle_for_update(session: AsyncSession, circle_id: UUID) -> Circle | None:
+    """
+    編集対象のサークルを取得する (非公開のサークルも含む).
+
+    Args:
+        session: データベースセッション
+        circle_id: サークルID
+
+    Returns:
+        サークル (存在しない・削除済みの場合は None)
+
+    Note:
+        行ロックは取得しない。競合は更新時にバージョンで検出する。
+    """
+    query = select(Circle).where(Circle.id == circle_id, Circle.deleted_at.is_(None))
+    result = await session.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def update_circle(session: AsyncSession, circle: Circle, data: CircleUpdate) -> Circle:
+    """
+    サークル情報を更新する.
+
+    Args:
+        session: データベースセッション
+        circle: get_circle_for_update で取得したサークル
+        data: 更新内容 (指定したフィールドのみ更新する)
+
+    Returns:
+        更新後のサークル (version は加算済み)
+
+    Raises:
+        VersionConflictError: 取得後に他のリクエストがサークルを更新していた場合
+
+    Note:
+        UPDATE は WHERE version = <取得時の値> 付きで実行されるため、競合しても待たずに失敗する。
+        コミットは呼び出し側で行う。
+    """
+    for field, value in data.model_dump(exclude_unset=True).items():
+        setattr(circle, field, value)
+    try:
+        await session.flush()
+    except StaleDataError as exc:
+        await session.rollback()
+        raise VersionConflictError(str(exc)) from exc
+    return circle
@@ -0,0 +1,167 @@
+"""In-process columnar index for filter-only circle list queries."""
+import asyncio
+import logging
+import time
+from array import array
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import async_session
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services.invalidation import NAMESPACE_CIRCLES, invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# カテゴリを列に格納する際のコード
+_CATEGORY_CODES = {category: code for code, category in enumerate(CircleCategory)}
+
+PostingKey = tuple[int | None, CircleCategory | None]
+
+
+class CircleColumnarIndex:
+    """
+    公開サークルの列指向スナップショット.
+
+    公開中・未削除のサークルを作成日時の新しい順に並べた配列と、
+    (campus_id, category) の組み合わせごとのポスティングリスト (配列上の位置) を保持する。
+    キーワード検索を含まない一覧取得は、ポスティングリストを切り出すだけで応答できる。
+
+    サークルの無効化通知を受け取った場合と、full_refresh_interval 秒ごとに全件を
+    読み直して作り直す。updated_at 等の差分では、コミットが遅れた書き込みや
+    物理削除された行を確実には検出できないため、差分更新は行わない。
+    無効化を通知しない書き込み (Core の一括 UPDATE 等) も、定期的な読み直しで反映される。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        refresh_interval: float,
+        max_staleness: float,
+        full_refresh_interval: float = 60.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.full_refresh_interval = full_refresh_interval
+        # 作成日時の新しい順に並べた列
+        self._records: list[dict[str, Any]] = []
+        self._postings: dict[PostingKey, array] = {}
+        self._loaded_at: float | None = None
+        self._refreshed_at: float | None = None
+        self._evictions: tuple[int, ...] | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def is_fresh(self) -> bool:
+        """
+        スナップショットを応答に使えるかどうか.
+
+        最終更新から max_staleness 秒以上経過している場合や、
+        最終更新後にサークルの無効化通知を受け取っている場合は False。
+        """
+        if self._refreshed_at is None:
+            return False
+        if time.monotonic() - self._refreshed_at > self.max_staleness:
+            return False
+        return invalidation_bus.evictions(NAMESPACE_CIRCLES) == self._evictions
+
+    def query(
+        self,
+        campus_id: int | None,
+        category: CircleCategory | None,
+        limit: int,
+        offset: int,
+    ) -> list[dict[str, Any]]:
+        """条件に一致するサークルを作成日時の新しい順に返す."""
+        posting = self._postings.get((campus_id, category))
+        if posting is None:
+            return []
+        return [self._records[position] for position in posting[offset : offset + limit]]
+
+    async def refresh(self) -> None:
+        """
+        スナップショットを最新にする.
+
+        前回から無効化通知を受け取っている場合と、前回の読み直しから
+        full_refresh_interval 秒以上経過している場合のみDBから全件を読み直す。
+        """
+        async with self._lock:
+            # 読み直し中に届いた通知は、次回の refresh で反映する
+            evictions = invalidation_bus.evictions(NAMESPACE_CIRCLES)
+            now = time.monotonic()
+            if (
+                self._loaded_at is None
+                or evictions != self._evictions
+                or now - self._loaded_at >= self.full_refresh_interval
+            ):
+                await self._load()
+                self._loaded_at = now
+            self._evictions = evictions
+            self._refreshed_at = now
+
+    async def _load(self) -> None:
+        """公開中のサークルを全件読み込み、列とポスティングリストを作り直す."""
+        query = (
+            select(Circle)
+            .where(Circle.is_published.is_(True), Circle.deleted_at.is_(None))
+            .order_by(Circle.created_at.desc())
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(query)
+            records = [circle.model_dump() for circle in result.scalars().all()]
+
+        campus_ids = array("H", (row["campus_id"] for row in records))
+        categories = array("B", (_CATEGORY_CODES[row["category"]] for row in records))
+        category_list = list(CircleCategory)
+
+        postings: dict[PostingKey, array] = {}
+        for position, (campus_id, code) in enumerate(zip(campus_ids, categories, strict=True)):
+            category = category_list[code]
+            for key in ((None, None), (campus_id, None), (None, category), (campus_id, category)):
+                postings.setdefault(key, array("I")).append(position)
+
+        # 参照を差し替えるだけなので、処理中のリクエストは古いスナップショットを見続ける
+        self._records, self._postings = records, postings
+
+    async def start(self) -> None:
+        """定期的な更新を開始する."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="circle-columnar-index")
+
+    async def stop(self) -> None:
+        """定期的な更新を停止する."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """refresh_interval ごとにスナップショットを更新する."""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to refresh circle columnar index")
+            await asyncio.sleep(self.refresh_interval)
+
+
+# ワーカー内で共有するスナップショット (settings.circle_index_enabled が True の場合のみ使用)
+circle_index = CircleColumnarIndex(
+    session_factory=async_session,
+    refresh_interval=settings.circle_index_refresh_seconds,
+    max_staleness=settings.circle_index_max_staleness_seconds,
+    full_refresh_interval=settings.circle_index_full_refresh_seconds,
+)
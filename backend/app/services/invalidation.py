@@ -0,0 +1,225 @@
+"""Cross-worker cache invalidation bus."""
+import asyncio
+import json
+import logging
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from sqlalchemy import Connection, event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, UOWTransaction
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.listener import pg_listener
+from app.db.session import async_session
+from app.models.announcement import Announcement
+from app.models.cache import (
+    CACHE_GENERATION_SEQUENCES,
+    NAMESPACE_ANNOUNCEMENTS,
+    NAMESPACE_CIRCLES,
+    NAMESPACE_MASTER,
+)
+from app.models.circle import Circle
+from app.models.master import Campus, CircleRole, SystemRole
+
+logger = logging.getLogger(__name__)
+
+# キャッシュ無効化に使う NOTIFY チャンネル名
+INVALIDATION_CHANNEL = "circleportal_cache_invalidation"
+
+# 1回の通知に含めるキーの上限 (超えた場合は名前空間ごと破棄する)
+MAX_KEYS_PER_NOTIFICATION = 100
+
+# 各名前空間の世代番号の現在値 (一度も採番されていない場合は NULL)
+_GENERATIONS_SQL = text(
+    """
+    SELECT sequencename, coalesce(last_value, 0)
+    FROM pg_sequences
+    WHERE schemaname = current_schema() AND sequencename = ANY(:names)
+    """
+)
+
+
+def publish_invalidation(
+    connection: Connection, namespace: str, keys: Iterable[Any] | None = None
+) -> None:
+    """
+    名前空間の世代番号を採番し、無効化を通知する.
+
+    書き込みと同じトランザクション内で呼び出すこと (通知はコミット時に配送される)。
+    世代番号はシーケンスで採番するため、同時に書き込むトランザクション同士を直列化しない。
+
+    Args:
+        connection: 書き込み中のトランザクションのコネクション
+        namespace: 無効化する名前空間
+        keys: 無効化するキー (None の場合は名前空間全体)
+    """
+    sequence = CACHE_GENERATION_SEQUENCES[namespace]
+    generation = connection.execute(select(sequence.next_value())).scalar_one()
+
+    key_list = None if keys is None else sorted({str(key) for key in keys})
+    if key_list is not None and len(key_list) > MAX_KEYS_PER_NOTIFICATION:
+        key_list = None
+    payload = json.dumps({"ns": namespace, "keys": key_list, "gen": generation})
+    connection.execute(select(func.pg_notify(INVALIDATION_CHANNEL, payload)))
+
+
+async def invalidate(
+    session: AsyncSession, namespace: str, keys: Iterable[Any] | None = None
+) -> None:
+    """
+    ORM を経由しない書き込みの後にキャッシュを無効化する.
+
+    Note:
+        コミットは呼び出し側で行う。
+    """
+    connection = await session.connection()
+    await connection.run_sync(publish_invalidation, namespace, keys)
+
+
+class InvalidationBus:
+    """
+    LISTEN/NOTIFY によるワーカー間のキャッシュ無効化.
+
+    キャッシュの所有者は名前空間にキャッシュを登録し、書き込み側は
+    publish_invalidation で名前空間 (とキー) を通知する。
+    通知を取りこぼした場合に備え、世代番号を定期的に確認し、
+    自ワーカーが把握している世代より進んでいれば名前空間全体を破棄する。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        poll_interval: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._caches: dict[str, list[tuple[TTLCache, bool]]] = {}
+        self._generations: dict[str, int] = {}
+        self._evictions: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def register(self, namespace: str, cache: TTLCache, by_key: bool = False) -> None:
+        """
+        名前空間にキャッシュを登録する.
+
+        Args:
+            namespace: 購読する名前空間
+            cache: 無効化対象のキャッシュ
+            by_key: True の場合は通知されたキーのエントリのみ破棄する
+                (キャッシュのキーが名前空間のキーと一致している場合に使う)。
+                False の場合は通知のたびにキャッシュ全体を破棄する。
+        """
+        self._caches.setdefault(namespace, []).append((cache, by_key))
+
+    def generation(self, namespace: str) -> int:
+        """自ワーカーが把握している名前空間の世代番号."""
+        return self._generations.get(namespace, 0)
+
+    def evictions(self, *namespaces: str) -> tuple[int, ...]:
+        """
+        名前空間ごとの、自ワーカーでキャッシュを破棄した回数.
+
+        DBから取得する前後で比較し、一致しない場合は取得中に無効化されているため
+        取得した値をキャッシュに保存しないこと (古い値を保存してしまうため)。
+        """
+        return tuple(self._evictions.get(namespace, 0) for namespace in namespaces)
+
+    def handle_notification(self, payload: str) -> None:
+        """無効化通知を受信した際の処理."""
+        try:
+            message = json.loads(payload)
+            namespace, keys, generation = message["ns"], message["keys"], int(message["gen"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation notification: %r", payload)
+            return
+
+        known = self._generations.get(namespace)
+        if known is not None and generation > known + 1:
+            # 途中の通知を取りこぼしているため、キーに関係なく全体を破棄する
+            keys = None
+        self._evict(namespace, keys)
+        self._generations[namespace] = max(generation, known or 0)
+
+    async def sync_generations(self) -> None:
+        """DB上の世代番号と比較し、進んでいる名前空間のキャッシュを破棄する."""
+        sequences = {
+            sequence.name: namespace for namespace, sequence in CACHE_GENERATION_SEQUENCES.items()
+        }
+        async with self.session_factory() as session:
+            result = await session.execute(_GENERATIONS_SQL, {"names": list(sequences)})
+            rows = result.all()
+        for name, generation in rows:
+            namespace = sequences[name]
+            if generation > self._generations.get(namespace, 0):
+                self._evict(namespace, None)
+                self._generations[namespace] = generation
+
+    async def start(self) -> None:
+        """世代番号の定期確認を開始する."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll(), name="cache-generation-poll")
+
+    async def stop(self) -> None:
+        """世代番号の定期確認を停止する."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll(self) -> None:
+        """poll_interval ごとに世代番号を確認する."""
+        while True:
+            try:
+                await self.sync_generations()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to sync cache generations")
+            await asyncio.sleep(self.poll_interval)
+
+    def _evict(self, namespace: str, keys: list[str] | None) -> None:
+        """登録されたキャッシュからエントリを破棄する."""
+        self._evictions[namespace] = self._evictions.get(namespace, 0) + 1
+        for cache, by_key in self._caches.get(namespace, []):
+            if keys is None or not by_key:
+                cache.clear()
+            else:
+                for key in keys:
+                    cache.delete(key)
+
+
+# ワーカー内で共有する無効化バス
+invalidation_bus = InvalidationBus(
+    session_factory=async_session,
+    poll_interval=settings.cache_generation_poll_seconds,
+)
+pg_listener.add_channel(INVALIDATION_CHANNEL, invalidation_bus.handle_notification)
+# LISTEN が切れていた間の通知は、再接続時に世代番号で補完する
+pg_listener.add_reconnect_callback(invalidation_bus.sync_generations)
+
+
+def _changed_keys(session: Session) -> dict[str, set[Any]]:
+    """フラッシュ対象のオブジェクトから、無効化すべき名前空間とキーを集める."""
+    changed: dict[str, set[Any]] = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Circle):
+            changed.setdefault(NAMESPACE_CIRCLES, set()).add(obj.id)
+        elif isinstance(obj, Announcement):
+            changed.setdefault(NAMESPACE_ANNOUNCEMENTS, set()).add(obj.circle_id)
+        elif isinstance(obj, Campus | CircleRole | SystemRole):
+            changed.setdefault(NAMESPACE_MASTER, set()).add(obj.__tablename__)
+    return changed
+
+
+@event.listens_for(Session, "after_flush")
+def _publish_invalidations(session: Session, flush_context: UOWTransaction) -> None:
+    """サークル・お知らせ・マスタデータの書き込みを全ワーカーのキャッシュへ通知する."""
+    for namespace, keys in _changed_keys(session).items():
+        publish_invalidation(session.connection(), namespace, keys)
@@ -0,0 +1,355 @@
+"""Database-backed background job queue."""
+import asyncio
+import importlib
+import logging
+import os
+import random
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import async_session
+from app.models.enums import JobStatus
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+# ジョブの種類 → ハンドラ
+job_handlers: dict[str, JobHandler] = {}
+
+# ハンドラを定義しているモジュール (ハンドラを追加したモジュールはここに加える)
+HANDLER_MODULES = ("app.services.ogp",)
+
+# 完了したジョブを1回に削除する件数 (長時間のロックを避けるため分割する)
+PURGE_BATCH_SIZE = 1000
+
+# 実行中のままワーカーが異常終了し、試行回数も使い切ったジョブに記録する失敗理由
+STALE_JOB_ERROR = "Worker stopped while running the job (lock expired)"
+
+jobs_claimed = metrics.counter("jobs_claimed_total", "Number of jobs claimed by workers")
+jobs_succeeded = metrics.counter("jobs_succeeded_total", "Number of jobs that succeeded")
+jobs_retried = metrics.counter("jobs_retried_total", "Number of failed jobs scheduled for retry")
+jobs_failed = metrics.counter("jobs_failed_total", "Number of jobs that exhausted their retries")
+jobs_seconds = metrics.counter("jobs_processing_seconds_total", "Time spent running job handlers")
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    ジョブのハンドラを登録するデコレータ.
+
+    例:
+        @job_handler("circle.notify_leader")
+        async def notify_leader(payload: dict) -> None:
+            ...
+    """
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        job_handlers[kind] = handler
+        return handler
+
+    return decorator
+
+
+def load_handlers() -> dict[str, JobHandler]:
+    """
+    HANDLER_MODULES を import してハンドラを登録する.
+
+    ワーカー (API の lifespan・app.worker) の起動時に呼び出す。
+    """
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    return job_handlers
+
+
+def enqueue(
+    session: AsyncSession,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    priority: int = 0,
+    delay: timedelta | None = None,
+    max_attempts: int | None = None,
+) -> Job:
+    """
+    ジョブを登録する.
+
+    Args:
+        session: データベースセッション
+        kind: ジョブの種類 (job_handler で登録した名前)
+        payload: ハンドラに渡す引数 (JSON に変換できる値)
+        priority: 優先度 (大きいほど先に実行)
+        delay: 実行を遅らせる時間 (optional)
+        max_attempts: 最大実行回数 (省略時は settings.job_max_attempts)
+
+    Returns:
+        登録したジョブ
+
+    Note:
+        コミットは呼び出し側で行う。業務データの書き込みと同じトランザクションで
+        登録すれば、書き込みがロールバックされた場合はジョブも登録されない。
+    """
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.job_max_attempts,
+        run_at=datetime.now(UTC) + (delay or timedelta()),
+    )
+    session.add(job)
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    リトライまでの待ち時間 (秒) を計算する.
+
+    指数バックオフ (base * 2^(attempts-1)、上限あり) に ±20% のゆらぎを加える。
+    """
+    delay = min(
+        settings.job_retry_base_seconds * 2 ** (attempts - 1), settings.job_retry_max_seconds
+    )
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobWorker:
+    """
+    ジョブを取り出して実行するワーカー.
+
+    concurrency 個のタスクがそれぞれ `FOR UPDATE SKIP LOCKED` でジョブを1件ずつ確保するため、
+    複数プロセス・複数ホストで同時に動かしても同じジョブが重複して実行されることはない。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session,
+        concurrency: int | None = None,
+        poll_interval: float | None = None,
+        handlers: dict[str, JobHandler] | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.poll_interval = poll_interval or settings.job_poll_seconds
+        self.handlers = job_handlers if handlers is None else handlers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = 0
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def claim(self) -> Job | None:
+        """
+        実行待ちのジョブを1件確保する.
+
+        他のワーカーがロック中の行は読み飛ばすため、確保処理同士で待ち合わせは発生しない。
+        """
+        candidate = (
+            select(Job.id)
+            .where(
+                Job.status == JobStatus.QUEUED,
+                Job.run_at <= func.now(),
+                Job.kind.in_(self.handlers),
+            )
+            .order_by(Job.priority.desc(), Job.run_at, Job.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Job)
+            .where(Job.id == candidate)
+            .values(
+                status=JobStatus.RUNNING,
+                attempts=Job.attempts + 1,
+                locked_at=func.now(),
+                locked_by=self.worker_id,
+            )
+            .returning(Job)
+        )
+        async with self.session_factory() as session:
+            job = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+        if job is not None:
+            jobs_claimed.inc(kind=job.kind)
+        return job
+
+    async def run_one(self) -> bool:
+        """
+        ジョブを1件確保して実行する.
+
+        Returns:
+            ジョブを実行した場合は True、実行待ちのジョブがなかった場合は False
+        """
+        job = await self.claim()
+        if job is None:
+            return False
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                self.handlers[job.kind](job.payload), timeout=settings.job_timeout_seconds
+            )
+        except asyncio.CancelledError:
+            # 停止時に中断したジョブは、試行回数を戻して実行待ちに戻す
+            await self._finish(job, status=JobStatus.QUEUED, attempts=job.attempts - 1)
+            raise
+        except Exception as exc:
+            logger.warning("Job %s (%s) failed: %r", job.id, job.kind, exc)
+            if job.attempts < job.max_attempts:
+                jobs_retried.inc(kind=job.kind)
+                await self._finish(
+                    job,
+                    status=JobStatus.QUEUED,
+                    run_at=func.now() + timedelta(seconds=retry_delay(job.attempts)),
+                    last_error=repr(exc)[:1000],
+                )
+            else:
+                jobs_failed.inc(kind=job.kind)
+                await self._finish(
+                    job,
+                    status=JobStatus.FAILED,
+                    finished_at=func.now(),
+                    last_error=repr(exc)[:1000],
+                )
+        else:
+            jobs_succeeded.inc(kind=job.kind)
+            await self._finish(job, status=JobStatus.SUCCEEDED, finished_at=func.now())
+        finally:
+            jobs_seconds.inc(time.perf_counter() - started, kind=job.kind)
+            self.processed += 1
+        return True
+
+    async def _finish(self, job: Job, **values: Any) -> None:
+        """ジョブの実行結果を記録し、確保を解除する."""
+        stmt = (
+            update(Job)
+            .where(Job.id == job.id, Job.locked_by == self.worker_id)
+            .values(locked_at=None, locked_by=None, **values)
+        )
+        async with self.session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def requeue_stale(self) -> tuple[int, int]:
+        """
+        実行中のまま一定時間が経過したジョブを回収する.
+
+        ワーカーのプロセスが異常終了した場合の回収用。試行回数 (確保した時点で加算済み) が
+        残っているジョブは実行待ちに戻し、使い切ったジョブは failed にする。
+        実行するたびにワーカーを異常終了させるジョブ (メモリ不足等) を延々と再実行しないため。
+
+        Returns:
+            (実行待ちに戻した件数, failed にした件数)
+        """
+        stale = (
+            Job.status == JobStatus.RUNNING,
+            Job.locked_at < func.now() - timedelta(seconds=settings.job_stale_seconds),
+        )
+        requeue = (
+            update(Job)
+            .where(*stale, Job.attempts < Job.max_attempts)
+            .values(status=JobStatus.QUEUED, locked_at=None, locked_by=None)
+        )
+        fail = (
+            update(Job)
+            .where(*stale, Job.attempts >= Job.max_attempts)
+            .values(
+                status=JobStatus.FAILED,
+                finished_at=func.now(),
+                locked_at=None,
+                locked_by=None,
+                last_error=STALE_JOB_ERROR,
+            )
+            .returning(Job.kind)
+        )
+        async with self.session_factory() as session:
+            requeued = (await session.execute(requeue)).rowcount
+            failed = (await session.execute(fail)).scalars().all()
+            await session.commit()
+        for kind in failed:
+            jobs_failed.inc(kind=kind)
+        return requeued, len(failed)
+
+    async def purge_finished(self) -> int:
+        """
+        完了 (成功・失敗) から settings.job_retention_seconds 以上経過したジョブを削除する.
+
+        Returns:
+            削除したジョブの件数
+        """
+        finished_before = func.now() - timedelta(seconds=settings.job_retention_seconds)
+        purged = 0
+        while True:
+            candidates = (
+                select(Job.id)
+                .where(
+                    Job.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED]),
+                    Job.finished_at < finished_before,
+                )
+                .limit(PURGE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            async with self.session_factory() as session:
+                result = await session.execute(delete(Job).where(Job.id.in_(candidates)))
+                await session.commit()
+            purged += result.rowcount
+            if result.rowcount < PURGE_BATCH_SIZE:
+                return purged
+
+    async def start(self) -> None:
+        """ワーカーのタスクを起動する."""
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"job-worker-{index}")
+            for index in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap(), name="job-worker-reaper"))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """実行中のジョブの完了を待ってから停止する (timeout 経過後は中断する)."""
+        self._stopping.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout) if self._tasks else ((), ())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        """ジョブがある限り実行し、なければ poll_interval 待つ."""
+        while not self._stopping.is_set():
+            try:
+                if await self.run_one():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker loop failed")
+            await self._sleep(self.poll_interval)
+
+    async def _reap(self) -> None:
+        """放置されたジョブの回収と、完了したジョブの削除を定期的に行う."""
+        while not self._stopping.is_set():
+            try:
+                requeued, failed = await self.requeue_stale()
+                if requeued or failed:
+                    logger.warning("Requeued %d and failed %d stale jobs", requeued, failed)
+                if purged := await self.purge_finished():
+                    logger.info("Purged %d finished jobs", purged)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to reap jobs")
+            await self._sleep(settings.job_stale_seconds / 2)
+
+    async def _sleep(self, seconds: float) -> None:
+        """停止要求があれば即座に戻る sleep."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except TimeoutError:
+            pass
@@ -0,0 +1,53 @@
+"""Master data (campuses, roles) service."""
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.master import Campus, CircleRole, SystemRole
+from app.services.invalidation import NAMESPACE_MASTER, invalidation_bus
+
+# マスタデータはほとんど変わらないため長めに保持し、書き込みがあれば全ワーカーで破棄する
+master_cache = TTLCache("master", ttl_seconds=settings.master_data_ttl_seconds)
+invalidation_bus.register(NAMESPACE_MASTER, master_cache)
+
+
+@dataclass(frozen=True)
+class MasterData:
+    """マスタデータのコード ⇔ ID の対応."""
+
+    campuses: dict[int, str]
+    circle_roles: dict[str, int]
+    system_roles: dict[str, int]
+
+
+async def get_master_data(session: AsyncSession) -> MasterData:
+    """
+    マスタデータを取得する.
+
+    Args:
+        session: データベースセッション
+
+    Returns:
+        キャンパス (ID → コード)、サークルロール・システムロール (コード → ID)
+
+    Note:
+        結果はワーカー内で settings.master_data_ttl_seconds 秒キャッシュされる。
+    """
+    master = master_cache.get("all")
+    if master is None:
+        evictions = invalidation_bus.evictions(NAMESPACE_MASTER)
+        campuses = await session.execute(select(Campus.id, Campus.code))
+        circle_roles = await session.execute(select(CircleRole.code, CircleRole.id))
+        system_roles = await session.execute(select(SystemRole.code, SystemRole.id))
+        master = MasterData(
+            campuses=dict(campuses.all()),
+            circle_roles=dict(circle_roles.all()),
+            system_roles=dict(system_roles.all()),
+        )
+        # 取得中に無効化された場合は、古い内容をキャッシュしない
+        if invalidation_bus.evictions(NAMESPACE_MASTER) == evictions:
+            master_cache.set("all", master)
+    return master
@@ -0,0 +1,177 @@
+"""Circle membership service layer."""
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.circle import (
+    Circle,
+    CircleMember,
+    CircleMemberEntry,
+    CircleMemberRead,
+    CircleRosterUpdate,
+)
+from app.models.master import CircleRole
+from app.models.user import User
+from app.services.master import get_master_data
+
+
+class RosterError(ValueError):
+    """名簿の内容が不正 (存在しないユーザー・ロールを含む、代表者がいなくなる)."""
+
+    def __init__(self, message: str, values: list[str]) -> None:
+        super().__init__(message)
+        self.values = values
+
+
+async def _resolve_users(session: AsyncSession, emails: list[str]) -> dict[str, UUID]:
+    """メールアドレスをユーザーIDに変換する (1クエリ)."""
+    if not emails:
+        return {}
+    result = await session.execute(select(User.email, User.id).where(User.email.in_(emails)))
+    users = dict(result.all())
+    unknown = sorted(set(emails) - users.keys())
+    if unknown:
+        raise RosterError("Unknown users", unknown)
+    return users
+
+
+async def _resolve_roles(session: AsyncSession, entries: list[CircleMemberEntry]) -> dict[str, int]:
+    """ロールのコードをロールIDに変換する."""
+    if not entries:
+        return {}
+    roles = (await get_master_data(session)).circle_roles
+    unknown = sorted({entry.role for entry in entries} - roles.keys())
+    if unknown:
+        raise RosterError("Unknown roles", unknown)
+    return roles
+
+
+async def update_circle_roster(
+    session: AsyncSession,
+    circle_id: UUID,
+    roster: CircleRosterUpdate,
+) -> list[CircleMemberRead] | None:
+    """
+    サークルの名簿を一括更新する.
+
+    Args:
+        session: データベースセッション
+        circle_id: サークルID
+        roster: 名簿全体、または追加・ロール変更・脱退の差分
+
+    Returns:
+        更新後の名簿 (サークルが存在しない・削除済みの場合は None)
+
+    Raises:
+        RosterError: 存在しないユーザー・ロールが含まれる場合、更新後に代表者 (leader) が
+            1人もいなくなる場合
+
+    Note:
+        メンバー数によらず、ユーザーの解決・追加/ロール変更・脱退をそれぞれ1文で行う。
+        コミットは呼び出し側で行う (名簿全体が1トランザクションで反映される)。
+        RosterError の場合、呼び出し側でロールバックすること (反映済みの変更が残るため)。
+        同じサークルの名簿の更新はサークルの行ロックで直列化する (READ COMMITTED では、
+        別々の代表者を同時に外すと、どちらの確認でも代表者が残っているように見えるため)。
+    """
+    # FOR NO KEY UPDATE: 名簿の更新同士は待ち合わせ、外部キーの確認 (KEY SHARE) は妨げない
+    circle = await session.execute(
+        select(Circle.id)
+        .where(Circle.id == circle_id, Circle.deleted_at.is_(None))
+        .with_for_update(key_share=True)
+    )
+    if circle.scalar_one_or_none() is None:
+        return None
+
+    upserts = roster.members if roster.members is not None else roster.upsert
+    users = await _resolve_users(session, [entry.email for entry in upserts] + roster.remove)
+    roles = await _resolve_roles(session, upserts)
+
+    if upserts:
+        stmt = pg_insert(CircleMember).values(
+            [
+                {
+                    "circle_id": circle_id,
+                    "user_id": users[entry.email],
+                    "role_id": roles[entry.role],
+                }
+                for entry in upserts
+            ]
+        )
+        # ロールが変わらないメンバーは更新しない (不要な行バージョンを作らない)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CircleMember.circle_id, CircleMember.user_id],
+                set_={"role_id": stmt.excluded.role_id},
+                where=CircleMember.role_id != stmt.excluded.role_id,
+            )
+        )
+
+    if roster.members is not None:
+        # 名簿に含まれないメンバーを脱退させる
+        await session.execute(
+            delete(CircleMember).where(
+                CircleMember.circle_id == circle_id,
+                CircleMember.user_id.not_in([users[entry.email] for entry in upserts]),
+            )
+        )
+    elif roster.remove:
+        await session.execute(
+            delete(CircleMember).where(
+                CircleMember.circle_id == circle_id,
+                CircleMember.user_id.in_([users[email] for email in roster.remove]),
+            )
+        )
+
+    # 同じトランザクション内で確認する (代表者のいないサークルは誰も名簿を管理できなくなる)
+    leader_id = (await get_master_data(session)).circle_roles["leader"]
+    leaders = await session.execute(
+        select(func.count())
+        .select_from(CircleMember)
+        .where(CircleMember.circle_id == circle_id, CircleMember.role_id == leader_id)
+    )
+    if leaders.scalar_one() == 0:
+        raise RosterError("Circle must have at least one leader", [])
+
+    return await get_circle_members(session, circle_id)
+
+
+async def get_circle_role(session: AsyncSession, circle_id: UUID, user_id: UUID) -> str | None:
+    """
+    ユーザーのサークル内ロールを取得する.
+
+    Returns:
+        ロールのコード (leader/editor/member)。メンバーでない場合は None
+    """
+    result = await session.execute(
+        select(CircleRole.code)
+        .join(CircleMember, CircleMember.role_id == CircleRole.id)
+        .where(CircleMember.circle_id == circle_id, CircleMember.user_id == user_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_circle_members(session: AsyncSession, circle_id: UUID) -> list[CircleMemberRead]:
+    """
+    サークルの名簿を取得する.
+
+    Args:
+        session: データベースセッション
+        circle_id: サークルID
+
+    Returns:
+        メンバーのリスト (ロール順 → ユーザー名順)
+    """
+    query = (
+        select(User.id, User.email, User.username, CircleRole.code)
+        .join(CircleMember, CircleMember.user_id == User.id)
+        .join(CircleRole, CircleRole.id == CircleMember.role_id)
+        .where(CircleMember.circle_id == circle_id)
+        .order_by(CircleRole.id, User.username, User.email)
+    )
+    result = await session.execute(query)
+    return [
+        CircleMemberRead(user_id=user_id, email=email, username=username, role=role)
+        for user_id, email, username, role in result.all()
+    ]
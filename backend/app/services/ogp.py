@@ -0,0 +1,307 @@
+"""OGP image rendering service."""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.db.session import async_session
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services.circle import get_circle_for_update
+from app.services.jobs import job_handler
+
+logger = logging.getLogger(__name__)
+
+# レイアウトを変更した場合は値を上げる (既存のキャッシュが使われなくなる)
+TEMPLATE_VERSION = 1
+
+IMAGE_SIZE = (1200, 630)
+LOGO_SIZE = 360
+MARGIN = 80
+
+# OGP_FONT_PATH を指定しない場合に探す CJK フォント
+FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",  # Debian/Ubuntu (fonts-noto-cjk)
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",  # Arch (noto-fonts-cjk)
+    "/usr/share/fonts/google-noto-sans-cjk-vf-fonts/NotoSansCJK-VF.ttc",  # Fedora
+    "/usr/share/fonts/opentype/ipaexfont-gothic/ipaexg.ttf",  # Debian/Ubuntu (fonts-ipaexfont)
+    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",  # macOS
+)
+
+CAMPUS_LABELS = {1: "八王子キャンパス", 2: "蒲田キャンパス"}
+CATEGORY_COLORS = {
+    CircleCategory.SPORTS: (230, 94, 60),
+    CircleCategory.CULTURE: (64, 120, 220),
+    CircleCategory.COMMITTEE: (70, 160, 110),
+}
+
+_executor: ProcessPoolExecutor | None = None
+# 同じ画像の生成要求が同時に来た場合は1回だけ描画する
+_render_flight = SingleFlight("ogp_render")
+
+
+def _resolve_logo_path(logo_url: str | None) -> Path | None:
+    """logo_url をローカルの静的ファイルのパスに変換する (外部URL・範囲外のパスは None)."""
+    if not logo_url or not logo_url.startswith("/static/"):
+        return None
+    static_dir = Path(settings.static_dir).resolve()
+    path = (static_dir / logo_url.removeprefix("/static/")).resolve()
+    if not path.is_relative_to(static_dir) or not path.is_file():
+        return None
+    return path
+
+
+class OgpFontUnavailableError(RuntimeError):
+    """OGP画像の描画に使える (日本語を描画できる) フォントがない."""
+
+
+def find_font_path() -> str | None:
+    """OGP画像に使うフォントのパス (OGP_FONT_PATH、未指定の場合は既知の CJK フォント)."""
+    if settings.ogp_font_path:
+        return settings.ogp_font_path
+    return next((path for path in FONT_CANDIDATES if Path(path).is_file()), None)
+
+
+def _has_cjk_glyphs(font: ImageFont.FreeTypeFont) -> bool:
+    """日本語を描画できるフォントかどうか (グリフがない文字はどれも同じ豆腐で描画される)."""
+    rendered = []
+    for char in "八蒲":
+        image = Image.new("L", (64, 64))
+        ImageDraw.Draw(image).text((0, 0), char, font=font, fill=255)
+        rendered.append(image)
+    return all(image.getbbox() for image in rendered) and (
+        rendered[0].tobytes() != rendered[1].tobytes()
+    )
+
+
+@functools.cache
+def _verify_font(path: str) -> None:
+    """フォントを読み込めて日本語を描画できることを確認する (確認できたパスは記憶する)."""
+    try:
+        font = ImageFont.truetype(path, 40)
+    except OSError as exc:
+        raise OgpFontUnavailableError(f"Cannot load OGP font: {path}") from exc
+    if not _has_cjk_glyphs(font):
+        raise OgpFontUnavailableError(f"OGP font cannot render Japanese text: {path}")
+
+
+def check_ogp_font() -> str:
+    """
+    OGP画像に使うフォントを確認する (描画前・起動時に呼び出す).
+
+    CJK フォントがないとサークル名・キャンパス名が全て豆腐 (□) で描画されるため、
+    フォントが見つからない・日本語を描画できない場合は描画しない。
+
+    Returns:
+        フォントのパス
+
+    Raises:
+        OgpFontUnavailableError: 日本語を描画できるフォントがない場合
+    """
+    path = find_font_path()
+    if path is None:
+        raise OgpFontUnavailableError(
+            "No CJK font found for OGP images: install fonts-noto-cjk or set OGP_FONT_PATH"
+        )
+    _verify_font(path)
+    return path
+
+
+def ogp_cache_key(circle: Circle) -> str:
+    """
+    OGP画像のキャッシュキー (入力内容のハッシュ) を計算する.
+
+    サークルの updated_at・ロゴファイルの更新日時/サイズが変わらない限り同じ値になる。
+    """
+    logo_path = _resolve_logo_path(circle.logo_url)
+    logo_stat = logo_path.stat() if logo_path else None
+    inputs = {
+        "template": TEMPLATE_VERSION,
+        "id": str(circle.id),
+        "name": circle.name,
+        "campus_id": circle.campus_id,
+        "category": circle.category.value,
+        "updated_at": circle.updated_at.isoformat(),
+        "logo_url": circle.logo_url,
+        "logo": [logo_stat.st_mtime_ns, logo_stat.st_size] if logo_stat else None,
+        "font": find_font_path(),
+    }
+    encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _load_font(font_path: str | None, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """
+    フォントを読み込む.
+
+    未指定の場合は Pillow 標準フォント (日本語は描画できない)。
+    通常は描画前に check_ogp_font で CJK フォントがあることを確認している。
+    """
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
+
+
+def _wrap_text(
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont,
+    max_width: int,
+    max_lines: int,
+) -> list[str]:
+    """日本語を含むテキストを1文字単位で折り返す (溢れた分は省略記号にする)."""
+    lines: list[str] = []
+    current = ""
+    for char in text:
+        if current and draw.textlength(current + char, font=font) > max_width:
+            lines.append(current)
+            current = ""
+            if len(lines) == max_lines:
+                lines[-1] = lines[-1][:-1] + "…"
+                return lines
+        current += char
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_ogp_image(
+    output_path: str,
+    name: str,
+    campus_label: str,
+    color: tuple[int, int, int],
+    logo_path: str | None,
+    font_path: str | None,
+) -> None:
+    """
+    OGP画像を描画してPNGで保存する.
+
+    プロセスプール上で実行されるため、引数は全て pickle 可能な値にしている。
+    書き込みは一時ファイル経由で行い、途中の状態のファイルが配信されないようにする。
+    """
+    image = Image.new("RGB", IMAGE_SIZE, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, IMAGE_SIZE[0], 24), fill=color)
+    draw.rectangle((0, IMAGE_SIZE[1] - 24, IMAGE_SIZE[0], IMAGE_SIZE[1]), fill=color)
+
+    text_left = MARGIN
+    if logo_path:
+        with Image.open(logo_path) as logo:
+            logo = logo.convert("RGBA")
+            logo.thumbnail((LOGO_SIZE, LOGO_SIZE))
+            top = (IMAGE_SIZE[1] - logo.height) // 2
+            image.paste(logo, (MARGIN + (LOGO_SIZE - logo.width) // 2, top), logo)
+        text_left = MARGIN * 2 + LOGO_SIZE
+
+    name_font = _load_font(font_path, 72)
+    campus_font = _load_font(font_path, 40)
+    max_width = IMAGE_SIZE[0] - text_left - MARGIN
+    lines = _wrap_text(draw, name, name_font, max_width, max_lines=3)
+
+    y = IMAGE_SIZE[1] // 2 - (len(lines) * 88 + 60) // 2
+    for line in lines:
+        draw.text((text_left, y), line, font=name_font, fill=(30, 30, 30))
+        y += 88
+    draw.text((text_left, y + 12), campus_label, font=campus_font, fill=color)
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    image.save(tmp_path, format="PNG", optimize=True)
+    os.replace(tmp_path, output_path)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """描画用のプロセスプールを取得する (初回呼び出し時に作成)."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.ogp_render_workers)
+    return _executor
+
+
+def shutdown_ogp_renderer() -> None:
+    """描画用のプロセスプールを停止する."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _remove_previous_images(cache_dir: Path, circle: Circle, current: Path) -> None:
+    """同じサークルの古い画像を削除する (更新のたびに使われないファイルが残らないようにする)."""
+    for path in cache_dir.glob(f"{circle.id}_*.png"):
+        if path != current:
+            path.unlink(missing_ok=True)
+
+
+async def get_ogp_image(circle: Circle) -> tuple[Path, str]:
+    """
+    サークルのOGP画像を取得する.
+
+    Args:
+        circle: 対象のサークル
+
+    Returns:
+        (画像ファイルのパス, キャッシュキー)
+
+    Raises:
+        OgpFontUnavailableError: 再生成が必要で、日本語を描画できるフォントがない場合
+
+    Note:
+        画像は入力内容のハッシュをファイル名としてディスクにキャッシュされ、
+        サークルの updated_at またはロゴが変わった場合のみ再生成される。
+        再生成した場合は、同じサークルの古い画像を削除する。
+        描画はイベントループを塞がないよう、プロセスプールで実行する。
+    """
+    key = ogp_cache_key(circle)
+    cache_dir = Path(settings.ogp_cache_dir)
+    output_path = cache_dir / f"{circle.id}_{key}.png"
+    if output_path.is_file():
+        return output_path, key
+    font_path = check_ogp_font()
+
+    async def render() -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        logo_path = _resolve_logo_path(circle.logo_url)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            _get_executor(),
+            render_ogp_image,
+            str(output_path),
+            circle.name,
+            CAMPUS_LABELS.get(circle.campus_id, ""),
+            CATEGORY_COLORS[circle.category],
+            str(logo_path) if logo_path else None,
+            font_path,
+        )
+        _remove_previous_images(cache_dir, circle, output_path)
+
+    await _render_flight.do(key, render)
+    return output_path, key
+
+
+@job_handler("ogp.render")
+async def render_ogp_job(payload: dict[str, Any]) -> None:
+    """
+    サークル更新後にOGP画像を事前に生成するジョブ.
+
+    payload: {"circle_id": "<UUID>"}
+    SNS のクローラーが最初に取得したときに描画を待たせないため。
+    サークルが削除されていた場合と、日本語を描画できるフォントがない場合は何もしない。
+    """
+    async with async_session() as session:
+        circle = await get_circle_for_update(session, UUID(payload["circle_id"]))
+    if circle is None:
+        return
+    try:
+        await get_ogp_image(circle)
+    except OgpFontUnavailableError as exc:
+        logger.warning("Skipping OGP image rendering: %s", exc)
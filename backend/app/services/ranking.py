@@ -0,0 +1,174 @@
+"""Recently updated circles ranking service."""
+import asyncio
+import json
+from datetime import UTC, datetime
+from typing import Any
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, UOWTransaction
+
+from app.core.cache import TTLCache
+from app.core.compression import CompressedBody
+from app.core.config import settings
+from app.models.activity import CircleActivity
+from app.models.announcement import Announcement
+from app.models.circle import Circle
+from app.services.invalidation import (
+    NAMESPACE_ANNOUNCEMENTS,
+    NAMESPACE_CIRCLES,
+    invalidation_bus,
+)
+
+# ランキングはワーカー内メモリに短時間だけ保持する (全訪問者で共有)
+recent_circles_cache = TTLCache("recent_circles", ttl_seconds=settings.recent_circles_ttl_seconds)
+# サークル・お知らせの書き込みがあれば、全ワーカーで即座に破棄する
+invalidation_bus.register(NAMESPACE_CIRCLES, recent_circles_cache)
+invalidation_bus.register(NAMESPACE_ANNOUNCEMENTS, recent_circles_cache)
+_refresh_lock = asyncio.Lock()
+_NAMESPACES = (NAMESPACE_CIRCLES, NAMESPACE_ANNOUNCEMENTS)
+
+
+def _collect_active_circle_ids(session: Session) -> set[UUID]:
+    """フラッシュ対象のオブジェクトから、活動があったサークルIDを集める."""
+    circle_ids: set[UUID] = set()
+    for obj in session.new:
+        if isinstance(obj, Circle):
+            circle_ids.add(obj.id)
+        elif isinstance(obj, Announcement) and obj.published_at is not None:
+            circle_ids.add(obj.circle_id)
+    for obj in session.dirty:
+        if isinstance(obj, Circle) and session.is_modified(obj):
+            circle_ids.add(obj.id)
+        elif isinstance(obj, Announcement) and obj.published_at is not None:
+            # 下書きから公開に切り替わった場合のみ「新しいお知らせ」として扱う
+            history = inspect(obj).attrs.published_at.history
+            if history.added and not any(history.deleted):
+                circle_ids.add(obj.circle_id)
+    return circle_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _record_circle_activity(session: Session, flush_context: UOWTransaction) -> None:
+    """
+    書き込みと同じトランザクションでランキングテーブルを差分更新する.
+
+    ORM 経由の書き込み (session.add / 属性更新) のみが対象。
+    Core の一括 UPDATE 等で更新した場合は record_circle_activity を直接呼び出すこと。
+    """
+    circle_ids = _collect_active_circle_ids(session)
+    if circle_ids:
+        session.connection().execute(_upsert_activity_statement(circle_ids, datetime.now(UTC)))
+
+
+def _upsert_activity_statement(circle_ids: set[UUID], at: datetime):
+    """最終活動日時を更新する UPSERT 文を組み立てる (時刻は巻き戻さない)."""
+    stmt = pg_insert(CircleActivity).values(
+        [{"circle_id": circle_id, "last_activity_at": at} for circle_id in circle_ids]
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[CircleActivity.circle_id],
+        set_={
+            "last_activity_at": func.greatest(
+                CircleActivity.last_activity_at, stmt.excluded.last_activity_at
+            )
+        },
+    )
+
+
+async def record_circle_activity(
+    session: AsyncSession,
+    circle_ids: set[UUID],
+    at: datetime | None = None,
+) -> None:
+    """
+    サークルの活動を明示的に記録する.
+
+    Args:
+        session: データベースセッション
+        circle_ids: 活動があったサークルIDの集合
+        at: 活動日時 (省略時は現在時刻)
+
+    Note:
+        コミットは呼び出し側で行う。
+    """
+    if circle_ids:
+        await session.execute(_upsert_activity_statement(circle_ids, at or datetime.now(UTC)))
+
+
+async def get_recent_circles(session: AsyncSession, limit: int) -> list[dict[str, Any]]:
+    """
+    最近更新されたサークルを取得する.
+
+    Args:
+        session: データベースセッション
+        limit: 取得件数 (最大 settings.recent_circles_limit)
+
+    Returns:
+        サークルのリスト (公開済み・削除されていないもののみ、最終活動日時の新しい順)
+
+    Note:
+        結果はワーカー内で settings.recent_circles_ttl_seconds 秒キャッシュされる。
+        サークル・お知らせの書き込みがあった場合は、無効化バスにより全ワーカーで破棄される。
+        キャッシュ切れ時に同時アクセスがあっても、DBへの問い合わせは1回だけ行う。
+    """
+    circles = recent_circles_cache.get("top")
+    if circles is None:
+        async with _refresh_lock:
+            circles = recent_circles_cache.get("top")
+            if circles is None:
+                evictions = invalidation_bus.evictions(*_NAMESPACES)
+                circles = await _fetch_recent_circles(session, settings.recent_circles_limit)
+                # 取得中に無効化された場合は、古い内容をキャッシュしない
+                if invalidation_bus.evictions(*_NAMESPACES) == evictions:
+                    recent_circles_cache.set("top", circles)
+    return circles[:limit]
+
+
+async def get_recent_circles_body(session: AsyncSession, limit: int) -> CompressedBody:
+    """
+    最近更新されたサークルを、シリアライズ・圧縮済みのレスポンスボディとして取得する.
+
+    Args:
+        session: データベースセッション
+        limit: 取得件数 (最大 settings.recent_circles_limit)
+
+    Returns:
+        JSON と、その gzip / brotli 圧縮済みのボディ
+
+    Note:
+        get_recent_circles と同じキャッシュに保持するため、無効化も同時に行われる。
+        キャッシュにヒットした場合は、シリアライズも圧縮も行わない。
+    """
+    key = f"body:{limit}"
+    payload = recent_circles_cache.get(key)
+    if payload is None:
+        evictions = invalidation_bus.evictions(*_NAMESPACES)
+        circles = await get_recent_circles(session, limit)
+        body = json.dumps(
+            jsonable_encoder(circles),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        payload = CompressedBody.build(body)
+        if invalidation_bus.evictions(*_NAMESPACES) == evictions:
+            recent_circles_cache.set(key, payload)
+    return payload
+
+
+async def _fetch_recent_circles(session: AsyncSession, limit: int) -> list[dict[str, Any]]:
+    """ランキングテーブルから上位のサークルを取得する."""
+    query = (
+        select(Circle)
+        .join(CircleActivity, CircleActivity.circle_id == Circle.id)
+        .where(Circle.is_published.is_(True), Circle.deleted_at.is_(None))
+        .order_by(CircleActivity.last_activity_at.desc())
+        .limit(limit)
+    )
+    result = await session.execute(query)
+    # セッションに紐づくORMオブジェクトを共有しないよう、辞書に変換して保持する
+    return [circle.model_dump() for circle in result.scalars().all()]
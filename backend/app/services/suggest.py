@@ -0,0 +1,93 @@
+"""Circle name autocomplete service."""
+from bisect import bisect_left
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.search import normalize_search_key
+from app.core.singleflight import SingleFlight
+from app.models.circle import Circle, CircleSuggestion
+from app.services.invalidation import NAMESPACE_CIRCLES, invalidation_bus
+
+suggest_cache = TTLCache("circle_suggest", ttl_seconds=settings.suggest_index_ttl_seconds)
+# サークルの書き込みがあれば、次の入力補完で索引を作り直す
+invalidation_bus.register(NAMESPACE_CIRCLES, suggest_cache)
+_build_flight = SingleFlight("circle_suggest_index")
+
+
+class SuggestIndex:
+    """
+    正規化済みサークル名のソート済み配列.
+
+    前方一致する範囲の先頭を二分探索で求めるため、検索はサークル数に対して O(log n)。
+    """
+
+    def __init__(self, entries: list[tuple[str, CircleSuggestion]]) -> None:
+        entries.sort(key=lambda entry: entry[0])
+        self._keys = [key for key, _ in entries]
+        self._suggestions = [suggestion for _, suggestion in entries]
+
+    def search(self, prefix: str, limit: int) -> list[CircleSuggestion]:
+        """正規化済みの prefix に前方一致する候補を返す."""
+        results: list[CircleSuggestion] = []
+        start = bisect_left(self._keys, prefix)
+        for index in range(start, len(self._keys)):
+            if len(results) >= limit or not self._keys[index].startswith(prefix):
+                break
+            results.append(self._suggestions[index])
+        return results
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+async def _build_index(session: AsyncSession) -> SuggestIndex:
+    """公開中のサークル名から索引を作成する."""
+    evictions = invalidation_bus.evictions(NAMESPACE_CIRCLES)
+    result = await session.execute(
+        select(Circle.id, Circle.name).where(
+            Circle.is_published.is_(True), Circle.deleted_at.is_(None)
+        )
+    )
+    index = SuggestIndex(
+        [
+            (normalize_search_key(name), CircleSuggestion(id=circle_id, name=name))
+            for circle_id, name in result.all()
+        ]
+    )
+    # 作成中に無効化された場合は、古い内容をキャッシュしない
+    if invalidation_bus.evictions(NAMESPACE_CIRCLES) == evictions:
+        suggest_cache.set("index", index)
+    return index
+
+
+async def suggest_circles(session: AsyncSession, prefix: str, limit: int) -> list[CircleSuggestion]:
+    """
+    サークル名の入力補完候補を取得する.
+
+    Args:
+        session: データベースセッション
+        prefix: 入力中の文字列 (ひらがな/カタカナ・全角/半角は区別しない)
+        limit: 取得件数上限
+
+    Returns:
+        前方一致したサークルのリスト (正規化済みの名前順)
+
+    Note:
+        索引はワーカー内メモリに保持し、サークルの書き込みがあった場合に作り直す。
+    """
+    key = normalize_search_key(prefix)
+    if not key:
+        return []
+    index = await get_suggest_index(session)
+    return index.search(key, limit)
+
+
+async def get_suggest_index(session: AsyncSession) -> SuggestIndex:
+    """入力補完の索引を取得する (キャッシュがなければ作成する)."""
+    index = suggest_cache.get("index")
+    if index is None:
+        index = await _build_flight.do("index", lambda: _build_index(session))
+    return index
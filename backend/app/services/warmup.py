@@ -0,0 +1,48 @@
+"""Cache and connection pool warm-up."""
+import asyncio
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.db.session import async_session, engine
+from app.services.circle_index import circle_index
+from app.services.invalidation import invalidation_bus
+from app.services.master import get_master_data
+from app.services.ranking import get_recent_circles_body
+from app.services.suggest import get_suggest_index
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_caches(session_factory: Callable[[], AsyncSession] = async_session) -> None:
+    """
+    よく使われるキャッシュを作成しておく.
+
+    マスタデータ、トップページのランキング、入力補完の索引、
+    (有効な場合は) サークル一覧のスナップショットが対象。
+
+    Note:
+        先に世代番号をDBと揃えておくため、作成したキャッシュが
+        ワーカー起動時の世代番号の同期で破棄されることはない。
+    """
+    await invalidation_bus.sync_generations()
+    async with session_factory() as session:
+        await get_master_data(session)
+        await get_recent_circles_body(session, settings.recent_circles_limit)
+        await get_suggest_index(session)
+    if settings.circle_index_enabled:
+        await circle_index.refresh()
+    logger.info("Caches warmed up")
+
+
+async def warm_connection_pool(size: int, db_engine: AsyncEngine = engine) -> None:
+    """コネクションプールに size 本の接続を張っておく (最初のリクエストで接続を待たせない)."""
+
+    async def connect() -> None:
+        async with db_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(connect() for _ in range(size)))
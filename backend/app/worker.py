@@ -0,0 +1,59 @@
+"""Standalone background job worker.
+
+API サーバーとは別プロセスでジョブを実行する場合に使用する::
+
+    uv run python -m app.worker --concurrency 8
+
+ハンドラは app.services.jobs.HANDLER_MODULES に列挙したモジュールを import して登録する
+(新しいハンドラを定義したモジュールはそこに追加する)。
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.db.session import init_db
+from app.services.jobs import JobWorker, load_handlers
+
+logger = logging.getLogger(__name__)
+
+
+async def run(concurrency: int) -> None:
+    """SIGINT / SIGTERM を受け取るまでジョブを実行する."""
+    await init_db()
+    handlers = load_handlers()
+    worker = JobWorker(concurrency=concurrency, handlers=handlers)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await worker.start()
+    logger.info(
+        "Job worker %s started (concurrency=%d, kinds=%s)",
+        worker.worker_id,
+        concurrency,
+        ", ".join(sorted(handlers)),
+    )
+    await stop.wait()
+    logger.info("Stopping job worker %s", worker.worker_id)
+    await worker.stop()
+
+
+def main() -> None:
+    """Entry point."""
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.job_worker_concurrency,
+        help="同時に実行するジョブ数",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
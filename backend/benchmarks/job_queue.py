@@ -0,0 +1,66 @@
+"""Benchmark job queue throughput.
+
+何もしないジョブを大量に登録し、ワーカー数ごとの処理件数/秒を計測する::
+
+    DEBUG=False uv run python -m benchmarks.job_queue --jobs 5000 --workers 1 2 4 8
+
+settings.database_url のデータベースを使用する (ベンチマーク用の種類のジョブのみ登録・削除する)。
+ワーカー数はコネクションプールの上限 (既定 15) 未満にすること。
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import delete, insert
+
+from app.db.session import async_session, init_db
+from app.models.job import Job
+from app.services.jobs import JobWorker
+
+KIND = "benchmark.noop"
+
+
+async def noop(payload: dict) -> None:
+    """何もしないジョブ."""
+
+
+async def enqueue_jobs(count: int) -> None:
+    """ベンチマーク用のジョブをまとめて登録する."""
+    async with async_session() as session:
+        await session.execute(delete(Job).where(Job.kind == KIND))
+        await session.execute(
+            insert(Job), [{"kind": KIND, "payload": {"n": n}} for n in range(count)]
+        )
+        await session.commit()
+
+
+async def measure(jobs: int, workers: int) -> float:
+    """jobs 件を workers 並列で処理し、処理件数/秒を返す."""
+    await enqueue_jobs(jobs)
+    worker = JobWorker(concurrency=workers, poll_interval=0.01, handlers={KIND: noop})
+    started = time.perf_counter()
+    await worker.start()
+    while worker.processed < jobs:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await worker.stop()
+    return jobs / elapsed
+
+
+async def main(jobs: int, workers: list[int]) -> None:
+    """Run benchmark."""
+    await init_db()
+    print(f"{'workers':>8} {'jobs/sec':>10}")
+    for count in workers:
+        print(f"{count:>8} {await measure(jobs, count):>10.1f}")
+    async with async_session() as session:
+        await session.execute(delete(Job).where(Job.kind == KIND))
+        await session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.workers))
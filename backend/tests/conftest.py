@@ -6,9 +6,12 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import NullPool
 from sqlmodel import SQLModel
 
+from app.core.cache import clear_all_caches
+from app.core.security import create_access_token
 from app.db.init_data import init_master_data
 from app.db.session import get_session
-from app.main import app
+from app.main import app, rate_limit_store
+from app.models.user import User
 
 # テスト用データベースURL (環境変数で上書き可能)
 import os
@@ -32,20 +35,23 @@ async def test_engine():
 
 
 @pytest.fixture(scope="function")
-async def db_session(test_engine):
-    """テスト用データベースセッション (各テストで初期化)."""
-    # テーブル作成
-    async with test_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
-
-    # セッション作成
-    async_session = sessionmaker(
+def session_factory(test_engine):
+    """テスト用DBのセッションファクトリ (ワーカー等に渡す・複数のセッションを使う場合)."""
+    return sessionmaker(
         test_engine,
         class_=AsyncSession,
         expire_on_commit=False,
     )
 
-    async with async_session() as session:
+
+@pytest.fixture(scope="function")
+async def db_session(test_engine, session_factory):
+    """テスト用データベースセッション (各テストで初期化)."""
+    # テーブル作成
+    async with test_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async with session_factory() as session:
         # マスタデータを初期化
         await init_master_data(session)
         yield session
@@ -63,6 +69,10 @@ async def client(db_session):
         yield db_session
 
     app.dependency_overrides[get_session] = get_test_session
+    # 前のテストのキャッシュ・レート制限が残らないようにする
+    clear_all_caches()
+    if rate_limit_store is not None:
+        rate_limit_store.clear()
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -71,3 +81,23 @@ async def client(db_session):
         yield ac
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def auth_headers():
+    """指定したユーザーのアクセストークンを付けたヘッダーを作る関数."""
+
+    def make_headers(auth_user_id: str) -> dict[str, str]:
+        return {"Authorization": f"Bearer {create_access_token(auth_user_id)}"}
+
+    return make_headers
+
+
+@pytest.fixture
+async def admin_headers(db_session, auth_headers):
+    """SystemAdmin を作成し、そのユーザーのヘッダーを返す."""
+    db_session.add(
+        User(username="admin", email="admin@example.com", sys_role_id=1, auth_user_id="admin")
+    )
+    await db_session.commit()
+    return auth_headers("admin")
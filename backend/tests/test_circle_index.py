@@ -0,0 +1,179 @@
+"""Test cases for the circle columnar index."""
+import json
+from datetime import UTC, datetime
+from uuid import uuid7
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import circles as circles_endpoint
+from app.core.config import settings
+from app.models.activity import CircleActivity
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services.circle_index import CircleColumnarIndex
+from app.services.invalidation import NAMESPACE_CIRCLES, invalidation_bus
+
+
+def make_index(session_factory: sessionmaker) -> CircleColumnarIndex:
+    """テスト用DBを参照するスナップショットを作成する."""
+    return CircleColumnarIndex(
+        session_factory, refresh_interval=60, max_staleness=60, full_refresh_interval=60
+    )
+
+
+def receive_invalidation() -> None:
+    """サークルの無効化通知を受信したことにする (テストでは LISTEN していないため)."""
+    generation = invalidation_bus.generation(NAMESPACE_CIRCLES)
+    invalidation_bus.handle_notification(
+        json.dumps({"ns": NAMESPACE_CIRCLES, "keys": None, "gen": generation + 1})
+    )
+
+
+async def add_circles(db_session: AsyncSession, *circles: Circle) -> None:
+    """作成日時の順序が確定するよう、1件ずつコミットする."""
+    for circle in circles:
+        db_session.add(circle)
+        await db_session.commit()
+
+
+class TestCircleColumnarIndex:
+    """CircleColumnarIndex のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_query_filters_and_orders(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """キャンパス・カテゴリで絞り込み、作成日時の新しい順に返す."""
+        await add_circles(
+            db_session,
+            Circle(name="A", campus_id=1, category=CircleCategory.SPORTS, is_published=True),
+            Circle(name="B", campus_id=2, category=CircleCategory.SPORTS, is_published=True),
+            Circle(name="C", campus_id=1, category=CircleCategory.CULTURE, is_published=True),
+            Circle(name="D", campus_id=1, category=CircleCategory.SPORTS, is_published=True),
+            Circle(name="非公開", campus_id=1, category=CircleCategory.SPORTS),
+        )
+        index = make_index(session_factory)
+        await index.refresh()
+
+        def names(campus_id=None, category=None, limit=20, offset=0):
+            rows = index.query(campus_id, category, limit, offset)
+            return [row["name"] for row in rows]
+
+        assert names() == ["D", "C", "B", "A"]
+        assert names(campus_id=1) == ["D", "C", "A"]
+        assert names(category=CircleCategory.SPORTS) == ["D", "B", "A"]
+        assert names(campus_id=1, category=CircleCategory.SPORTS) == ["D", "A"]
+        assert names(campus_id=2, category=CircleCategory.COMMITTEE) == []
+        assert names(limit=2, offset=1) == ["C", "B"]
+
+    @pytest.mark.asyncio
+    async def test_refresh_after_invalidation(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """無効化通知を受け取ると、公開・非公開の変更が反映される."""
+        first = Circle(name="A", campus_id=1, category=CircleCategory.SPORTS, is_published=True)
+        second = Circle(name="B", campus_id=1, category=CircleCategory.SPORTS)
+        await add_circles(db_session, first, second)
+        index = make_index(session_factory)
+        await index.refresh()
+        assert len(index) == 1
+
+        first.is_published = False
+        second.is_published = True
+        await db_session.commit()
+        # 通知がなければDBは読み直さない
+        await index.refresh()
+        assert [row["name"] for row in index.query(None, None, 20, 0)] == ["A"]
+
+        receive_invalidation()
+        await index.refresh()
+        assert [row["name"] for row in index.query(None, None, 20, 0)] == ["B"]
+
+    @pytest.mark.asyncio
+    async def test_periodic_full_refresh(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """通知されない書き込み (物理削除・古い updated_at) も定期的な読み直しで反映される."""
+        circle = Circle(name="A", campus_id=1, category=CircleCategory.SPORTS, is_published=True)
+        await add_circles(db_session, circle)
+        index = make_index(session_factory)
+        await index.refresh()
+        assert len(index) == 1
+
+        await db_session.execute(delete(CircleActivity))
+        await db_session.execute(delete(Circle.__table__))
+        await db_session.execute(
+            insert(Circle.__table__).values(
+                id=uuid7(),
+                name="B",
+                name_search_key="b",
+                campus_id=1,
+                category=CircleCategory.SPORTS,
+                is_published=True,
+                created_at=datetime(2020, 1, 1, tzinfo=UTC),
+                updated_at=datetime(2020, 1, 1, tzinfo=UTC),
+            )
+        )
+        await db_session.commit()
+
+        index.full_refresh_interval = 0
+        await index.refresh()
+        assert [row["name"] for row in index.query(None, None, 20, 0)] == ["B"]
+
+    @pytest.mark.asyncio
+    async def test_stale_after_invalidation(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """更新後に無効化通知を受け取ると、スナップショットは使われなくなる."""
+        index = make_index(session_factory)
+        assert index.is_fresh() is False
+
+        await index.refresh()
+        assert index.is_fresh() is True
+
+        receive_invalidation()
+        assert index.is_fresh() is False
+
+
+class TestListCirclesFromIndex:
+    """GET /api/v1/circles のスナップショット利用のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_list_circles_uses_fresh_index(
+        self,
+        client: AsyncClient,
+        session_factory: sessionmaker,
+        db_session: AsyncSession,
+        monkeypatch,
+    ):
+        """スナップショットが新しければメモリから応答し、古くなればSQLに切り替わる."""
+        index = make_index(session_factory)
+        monkeypatch.setattr(settings, "circle_index_enabled", True)
+        monkeypatch.setattr(circles_endpoint, "circle_index", index)
+        await add_circles(
+            db_session,
+            Circle(name="A", campus_id=1, category=CircleCategory.SPORTS, is_published=True),
+        )
+        await index.refresh()
+
+        # スナップショット作成後に追加されたサークルは、まだ返らない
+        await add_circles(
+            db_session,
+            Circle(name="B", campus_id=1, category=CircleCategory.SPORTS, is_published=True),
+        )
+        response = await client.get("/api/v1/circles?campus_id=1")
+        assert response.status_code == 200
+        assert [circle["name"] for circle in response.json()] == ["A"]
+
+        # キーワード検索はSQLで処理される
+        response = await client.get("/api/v1/circles?q=B")
+        assert [circle["name"] for circle in response.json()] == ["B"]
+
+        # 古くなったスナップショットは使われない
+        monkeypatch.setattr(index, "max_staleness", -1)
+        response = await client.get("/api/v1/circles?campus_id=1")
+        assert [circle["name"] for circle in response.json()] == ["B", "A"]
@@ -3,10 +3,22 @@ from datetime import UTC, datetime
 
 import pytest
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.models.circle import Circle
-from app.models.enums import CircleCategory
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints import circles as circles_endpoint
+from app.models.announcement import Announcement
+from app.models.circle import Circle, CircleMember, CircleUpdate
+from app.models.enums import AnnouncementType, CircleCategory
+from app.models.user import User
+from app.services.circle import (
+    VersionConflictError,
+    backfill_name_search_keys,
+    get_circle_for_update,
+    get_circles,
+    update_circle,
+)
 
 
 class TestGetCircles:
@@ -149,6 +161,63 @@ class TestGetCircles:
         assert len(data) == 1
         assert data[0]["name"] == "LinuxClub"
 
+    @pytest.mark.asyncio
+    async def test_get_circles_search_ignores_kana_and_width(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """サークル名の検索はひらがな/カタカナ・全角/半角の違いを無視する."""
+        circle = Circle(
+            name="ギター同好会",
+            campus_id=1,
+            category=CircleCategory.CULTURE,
+            is_published=True,
+        )
+        db_session.add(circle)
+        await db_session.commit()
+
+        for keyword in ["ぎたー", "ｷﾞﾀｰ", "ギター"]:
+            response = await client.get("/api/v1/circles", params={"q": keyword})
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data) == 1
+            assert data[0]["name"] == "ギター同好会"
+            assert "name_search_key" not in data[0]
+
+    @pytest.mark.asyncio
+    async def test_backfill_name_search_keys(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """検索キーが未設定の既存サークルも、起動時の補完後は名前で検索できる."""
+        circle = Circle(
+            name="ギター同好会",
+            campus_id=1,
+            category=CircleCategory.CULTURE,
+            is_published=True,
+        )
+        db_session.add(circle)
+        await db_session.commit()
+        # 検索キーを追加する前から存在したサークルを再現する
+        table = Circle.__table__
+        await db_session.execute(
+            update(table).values(name_search_key="", updated_at=table.c.updated_at)
+        )
+        await db_session.commit()
+        await db_session.refresh(circle)
+        updated_at, version = circle.updated_at, circle.version
+
+        response = await client.get("/api/v1/circles", params={"q": "ぎたー"})
+        assert response.json() == []
+
+        assert await backfill_name_search_keys(db_session) == 1
+        await db_session.commit()
+        assert await backfill_name_search_keys(db_session) == 0
+
+        response = await client.get("/api/v1/circles", params={"q": "ぎたー"})
+        assert [row["name"] for row in response.json()] == ["ギター同好会"]
+        # 更新としては扱わない
+        await db_session.refresh(circle)
+        assert (circle.updated_at, circle.version) == (updated_at, version)
+
     @pytest.mark.asyncio
     async def test_get_circles_pagination(
         self, client: AsyncClient, db_session: AsyncSession
@@ -217,6 +286,339 @@ class TestGetCircles:
         assert response.status_code == 422
 
 
+class TestSuggestCircles:
+    """GET /api/v1/circles/suggest のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_suggest_ignores_kana_and_width(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """ひらがな/カタカナ・全角/半角の違いを無視して前方一致する."""
+        db_session.add_all(
+            [
+                Circle(
+                    name="サッカー部",
+                    campus_id=1,
+                    category=CircleCategory.SPORTS,
+                    is_published=True,
+                ),
+                Circle(
+                    name="LinuxClub",
+                    campus_id=1,
+                    category=CircleCategory.CULTURE,
+                    is_published=True,
+                ),
+            ]
+        )
+        await db_session.commit()
+
+        for prefix in ["さっか", "ｻｯｶ", "サッカ"]:
+            response = await client.get("/api/v1/circles/suggest", params={"prefix": prefix})
+            assert response.status_code == 200
+            assert [item["name"] for item in response.json()] == ["サッカー部"]
+
+        response = await client.get("/api/v1/circles/suggest", params={"prefix": "ｌｉｎ"})
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["name"] == "LinuxClub"
+        assert set(data[0]) == {"id", "name"}
+
+    @pytest.mark.asyncio
+    async def test_suggest_excludes_unpublished(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """非公開サークルは候補に含まれない."""
+        db_session.add(
+            Circle(name="非公開サークル", campus_id=1, category=CircleCategory.SPORTS)
+        )
+        await db_session.commit()
+
+        response = await client.get("/api/v1/circles/suggest", params={"prefix": "非公開"})
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_suggest_requires_prefix(self, client: AsyncClient):
+        """prefix が空の場合、エラーが返る."""
+        response = await client.get("/api/v1/circles/suggest", params={"prefix": ""})
+        assert response.status_code == 422
+
+
+class TestGetRecentCircles:
+    """GET /api/v1/circles/recent のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_get_recent_circles_empty(self, client: AsyncClient):
+        """サークルが0件の場合、空のリストが返る."""
+        response = await client.get("/api/v1/circles/recent")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_get_recent_circles_orders_by_activity(
+        self, client: AsyncClient, db_session: AsyncSession
+    ):
+        """サークルの編集・お知らせの公開が新しい順に並ぶ(非公開は除外)."""
+        old_circle = Circle(
+            name="古いサークル",
+            campus_id=1,
+            category=CircleCategory.CULTURE,
+            is_published=True,
+        )
+        db_session.add(old_circle)
+        await db_session.commit()
+
+        new_circle = Circle(
+            name="新しいサークル",
+            campus_id=1,
+            category=CircleCategory.SPORTS,
+            is_published=True,
+        )
+        hidden_circle = Circle(
+            name="非公開サークル",
+            campus_id=2,
+            category=CircleCategory.SPORTS,
+            is_published=False,
+        )
+        db_session.add_all([new_circle, hidden_circle])
+        await db_session.commit()
+
+        # 古いサークルがお知らせを公開すると先頭に来る
+        announcement = Announcement(
+            circle_id=old_circle.id,
+            type=AnnouncementType.NEWS,
+            title="新歓のお知らせ",
+            published_at=datetime.now(UTC),
+        )
+        db_session.add(announcement)
+        await db_session.commit()
+
+        response = await client.get("/api/v1/circles/recent")
+        assert response.status_code == 200
+        data = response.json()
+        assert [circle["name"] for circle in data] == ["古いサークル", "新しいサークル"]
+
+    @pytest.mark.asyncio
+    async def test_get_recent_circles_limit_validation(self, client: AsyncClient):
+        """limit の値が範囲外の場合、エラーが返る."""
+        response = await client.get("/api/v1/circles/recent?limit=0")
+        assert response.status_code == 422
+
+        response = await client.get("/api/v1/circles/recent?limit=9")
+        assert response.status_code == 422
+
+
+class TestSparseFieldsets:
+    """fields= による取得フィールドの指定のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_list_circles_with_fields(self, client: AsyncClient, db_session: AsyncSession):
+        """指定したフィールド (と id) のみが返る."""
+        db_session.add(
+            Circle(
+                name="テニス部",
+                description="長い説明文" * 50,
+                campus_id=1,
+                category=CircleCategory.SPORTS,
+                is_published=True,
+            )
+        )
+        await db_session.commit()
+
+        response = await client.get(
+            "/api/v1/circles", params={"fields": "name,category,logo_url"}
+        )
+        assert response.status_code == 200
+        [circle] = response.json()
+        assert set(circle) == {"id", "name", "category", "logo_url"}
+        assert circle["category"] == "sports"
+        assert circle["logo_url"] is None
+
+    @pytest.mark.asyncio
+    async def test_get_circles_selects_only_requested_columns(self, db_session: AsyncSession):
+        """サービス層でも指定したカラムのみを取得する."""
+        db_session.add(
+            Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS, is_published=True)
+        )
+        await db_session.commit()
+
+        circles = await get_circles(db_session, fields=("id", "name"))
+        assert [set(circle) for circle in circles] == [{"id", "name"}]
+
+    @pytest.mark.asyncio
+    async def test_unknown_field(self, client: AsyncClient):
+        """許可されていないフィールドを指定した場合、エラーが返る."""
+        response = await client.get("/api/v1/circles", params={"fields": "name,name_search_key"})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_get_circle_with_fields(self, client: AsyncClient, db_session: AsyncSession):
+        """サークル詳細でも fields= を指定できる (非公開は 404)."""
+        circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(circle)
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}")
+        assert response.status_code == 404
+
+        circle.is_published = True
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}")
+        assert response.status_code == 200
+        assert response.json()["name"] == "テニス部"
+        assert "name_search_key" not in response.json()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}", params={"fields": "name"})
+        assert response.json() == {"id": str(circle.id), "name": "テニス部"}
+
+
+class TestUpdateCircle:
+    """PUT /api/v1/circles/{id} のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_update_with_if_match(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """If-Match が現在の ETag と一致すれば更新され、古い ETag なら 412 が返る."""
+        circle = Circle(
+            name="テニス部", campus_id=1, category=CircleCategory.SPORTS, is_published=True
+        )
+        db_session.add(circle)
+        await db_session.commit()
+        url = f"/api/v1/circles/{circle.id}"
+
+        response = await client.get(url)
+        etag = response.headers["etag"]
+        assert etag == '"1"'
+
+        response = await client.put(
+            url, json={"description": "週3回活動"}, headers={**admin_headers, "If-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.json()["description"] == "週3回活動"
+        assert response.json()["version"] == 2
+        assert response.headers["etag"] == '"2"'
+
+        # 古い ETag での更新は失敗する
+        response = await client.put(
+            url, json={"name": "硬式テニス部"}, headers={**admin_headers, "If-Match": etag}
+        )
+        assert response.status_code == 412
+        assert response.headers["etag"] == '"2"'
+
+        # If-Match なしの場合は無条件に更新する
+        response = await client.put(url, json={"name": "硬式テニス部"}, headers=admin_headers)
+        assert response.status_code == 200
+        assert response.json()["name"] == "硬式テニス部"
+        assert response.json()["description"] == "週3回活動"
+
+    @pytest.mark.asyncio
+    async def test_update_validation(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """NOT NULL のフィールドに null は指定できず、存在しないサークルは 404."""
+        circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(circle)
+        await db_session.commit()
+
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}", json={"name": None}, headers=admin_headers
+        )
+        assert response.status_code == 422
+
+        response = await client.put(
+            "/api/v1/circles/00000000-0000-0000-0000-000000000000",
+            json={"name": "x"},
+            headers=admin_headers,
+        )
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_update_requires_circle_editor(
+        self, client: AsyncClient, db_session: AsyncSession, auth_headers
+    ):
+        """当該サークルの Leader / Editor と SystemAdmin 以外は更新できない."""
+        circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+        leader, member = (
+            User(username=name, email=f"{name}@example.com", sys_role_id=2, auth_user_id=name)
+            for name in ("leader", "member")
+        )
+        db_session.add_all([circle, leader, member])
+        await db_session.flush()
+        db_session.add_all(
+            [
+                CircleMember(circle_id=circle.id, user_id=leader.id, role_id=1),
+                CircleMember(circle_id=circle.id, user_id=member.id, role_id=3),
+            ]
+        )
+        await db_session.commit()
+        url = f"/api/v1/circles/{circle.id}"
+
+        body = {"name": "硬式テニス部"}
+
+        response = await client.put(url, json=body)
+        assert response.status_code == 401
+        response = await client.put(url, json=body, headers=auth_headers("member"))
+        assert response.status_code == 403
+        response = await client.put(url, json=body, headers=auth_headers("leader"))
+        assert response.status_code == 200
+        assert response.json()["name"] == "硬式テニス部"
+
+    @pytest.mark.asyncio
+    async def test_conflict_returns_current_etag(
+        self,
+        client: AsyncClient,
+        test_engine: AsyncEngine,
+        db_session: AsyncSession,
+        monkeypatch,
+        admin_headers: dict[str, str],
+    ):
+        """読み込み後に他のリクエストが更新した場合、412 と現在の ETag を返す."""
+        circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(circle)
+        await db_session.commit()
+        original = circles_endpoint.update_circle
+
+        async def update_after_other_request(session, circle, data):
+            # 読み込みと更新の間に、別の接続から2回更新される
+            async with test_engine.begin() as conn:
+                for _ in range(2):
+                    await conn.execute(
+                        update(Circle)
+                        .where(Circle.id == circle.id)
+                        .values(version=Circle.version + 1)
+                    )
+            return await original(session=session, circle=circle, data=data)
+
+        monkeypatch.setattr(circles_endpoint, "update_circle", update_after_other_request)
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}", json={"name": "硬式テニス部"}, headers=admin_headers
+        )
+
+        assert response.status_code == 412
+        assert response.headers["etag"] == '"3"'
+
+    @pytest.mark.asyncio
+    async def test_concurrent_update_conflicts(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """取得後に他のセッションが更新していた場合、待たずに VersionConflictError になる."""
+        circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(circle)
+        await db_session.commit()
+
+        async with session_factory() as first, session_factory() as second:
+            mine = await get_circle_for_update(first, circle.id)
+            theirs = await get_circle_for_update(second, circle.id)
+
+            await update_circle(second, theirs, CircleUpdate(description="先に更新"))
+            await second.commit()
+
+            with pytest.raises(VersionConflictError):
+                await update_circle(first, mine, CircleUpdate(description="後から更新"))
+
+
 class TestSQLInjectionResistance:
     """SQLインジェクション攻撃への耐性テスト."""
 
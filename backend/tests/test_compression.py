@@ -0,0 +1,149 @@
+"""Test cases for response compression."""
+import gzip
+import json
+
+import brotli
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import compression
+from app.core.compression import CompressedBody, select_encoding
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+
+
+class TestSelectEncoding:
+    """select_encoding のテスト."""
+
+    @pytest.mark.parametrize(
+        ("accept_encoding", "expected"),
+        [
+            (None, None),
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, gzip;q=0", None),
+            ("*", "br"),
+            ("*;q=0.1, gzip;q=0.5", "gzip"),
+        ],
+    )
+    def test_select_encoding(self, accept_encoding, expected):
+        """q 値の最も大きい対応方式を選ぶ (同じなら brotli 優先)."""
+        assert select_encoding(accept_encoding) == expected
+
+
+class TestCompressedBody:
+    """CompressedBody のテスト."""
+
+    def test_build_compresses_large_body(self):
+        """最小サイズ以上のボディは全方式で圧縮しておく."""
+        body = json.dumps([{"description": "サークル紹介" * 100}]).encode()
+        payload = CompressedBody.build(body)
+
+        assert gzip.decompress(payload.variants["gzip"]) == body
+        assert brotli.decompress(payload.variants["br"]) == body
+
+        response = payload.to_response("gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.body == payload.variants["gzip"]
+        assert payload.to_response(None).body == body
+
+    def test_build_skips_small_body(self):
+        """最小サイズ未満のボディは圧縮しない."""
+        payload = CompressedBody.build(b"[]")
+        assert payload.variants == {}
+        response = payload.to_response("br")
+        assert "content-encoding" not in response.headers
+        assert response.body == b"[]"
+
+
+class TestCompressionMiddleware:
+    """CompressionMiddleware のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_large_json_is_compressed(self, client: AsyncClient, db_session: AsyncSession):
+        """大きな JSON レスポンスは Accept-Encoding に応じて圧縮される."""
+        for index in range(20):
+            db_session.add(
+                Circle(
+                    name=f"サークル{index}",
+                    description="活動内容の説明です。" * 20,
+                    campus_id=1,
+                    category=CircleCategory.CULTURE,
+                    is_published=True,
+                )
+            )
+        await db_session.commit()
+
+        for encoding in ("br", "gzip"):
+            response = await client.get(
+                "/api/v1/circles", headers={"Accept-Encoding": encoding}
+            )
+            assert response.status_code == 200
+            assert response.headers["content-encoding"] == encoding
+            assert "Accept-Encoding" in response.headers["vary"]
+            assert len(response.json()) == 20
+
+        response = await client.get("/api/v1/circles", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert len(response.json()) == 20
+
+    @pytest.mark.asyncio
+    async def test_small_response_is_not_compressed(self, client: AsyncClient):
+        """最小サイズ未満のレスポンスは圧縮しない."""
+        response = await client.get("/api/v1/circles", headers={"Accept-Encoding": "br, gzip"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.json() == []
+
+    @pytest.mark.asyncio
+    async def test_cached_response_is_not_recompressed(
+        self, client: AsyncClient, db_session: AsyncSession, monkeypatch
+    ):
+        """キャッシュされたレスポンスは、圧縮済みのボディをそのまま返す."""
+        for index in range(8):
+            db_session.add(
+                Circle(
+                    name=f"サークル{index}",
+                    description="活動内容の説明です。" * 20,
+                    campus_id=1,
+                    category=CircleCategory.SPORTS,
+                    is_published=True,
+                )
+            )
+        await db_session.commit()
+
+        calls = []
+        original = compression.compress
+
+        def counting_compress(body: bytes, encoding: str) -> bytes:
+            calls.append(encoding)
+            return original(body, encoding)
+
+        monkeypatch.setattr(compression, "compress", counting_compress)
+
+        first = await client.get("/api/v1/circles/recent", headers={"Accept-Encoding": "br"})
+        assert first.headers["content-encoding"] == "br"
+        assert sorted(calls) == ["br", "gzip"]
+
+        second = await client.get("/api/v1/circles/recent", headers={"Accept-Encoding": "gzip"})
+        assert second.headers["content-encoding"] == "gzip"
+        assert second.json() == first.json()
+        assert sorted(calls) == ["br", "gzip"]
+
+    @pytest.mark.asyncio
+    async def test_recent_circles_openapi(self, client: AsyncClient):
+        """OpenAPI に実際のレスポンス (Circle の配列・圧縮ヘッダー) が記載される."""
+        response = await client.get("/openapi.json")
+
+        operation = response.json()["paths"]["/api/v1/circles/recent"]["get"]
+        ok = operation["responses"]["200"]
+        schema = ok["content"]["application/json"]["schema"]
+        assert schema["type"] == "array"
+        assert schema["items"] == {"$ref": "#/components/schemas/Circle"}
+        assert set(ok["headers"]) == {"Content-Encoding", "Vary"}
+
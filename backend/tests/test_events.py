@@ -0,0 +1,146 @@
+"""Test cases for the change feed."""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db.listener import PgListener, asyncpg_dsn
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services.change_feed import CHANGE_CHANNEL, ChangeFeed
+
+
+class TestChangeFeed:
+    """ChangeFeed の配信のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_publish_fans_out_to_all_subscribers(self):
+        """全ての購読者に同じイベントが届く."""
+        feed = ChangeFeed(queue_size=10)
+        first = feed.subscribe()
+        second = feed.subscribe()
+
+        feed.publish('{"entity":"circle","op":"insert","id":"1"}')
+
+        expected = 'event: circle\ndata: {"entity":"circle","op":"insert","id":"1"}\n\n'
+        assert await first.get() == expected
+        assert await second.get() == expected
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_dropped(self):
+        """キューが溢れた購読者は切り離され、他の購読者には影響しない."""
+        feed = ChangeFeed(queue_size=1)
+        slow = feed.subscribe()
+        fast = feed.subscribe()
+
+        feed.publish('{"entity":"circle","op":"insert","id":"1"}')
+        assert await fast.get() is not None
+        feed.publish('{"entity":"circle","op":"update","id":"1"}')
+
+        assert slow.dropped is True
+        assert await slow.get() is None
+        assert feed.subscriber_count == 1
+        assert "update" in await fast.get()
+
+    @pytest.mark.asyncio
+    async def test_malformed_payload_is_ignored(self):
+        """不正なペイロードは配信されない."""
+        feed = ChangeFeed(queue_size=10)
+        subscription = feed.subscribe()
+
+        feed.publish("not json")
+
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(subscription.get(), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_close_ends_all_subscriptions(self):
+        """close すると全ての購読が終了し、その後の購読もすぐに終了する."""
+        feed = ChangeFeed(queue_size=10)
+        subscription = feed.subscribe()
+
+        feed.close()
+
+        assert await subscription.get() is None
+        assert feed.subscriber_count == 0
+        assert await feed.subscribe().get() is None
+        assert feed.subscriber_count == 0
+
+
+class TestChangeNotifications:
+    """書き込み時の NOTIFY と LISTEN のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_commit_notifies_listener(
+        self, test_engine: AsyncEngine, db_session: AsyncSession
+    ):
+        """公開サークルの作成がコミット後に通知される(非公開サークルは通知されない)."""
+        feed = ChangeFeed(queue_size=10)
+        subscription = feed.subscribe()
+        listener = PgListener(asyncpg_dsn(test_engine.url.render_as_string(hide_password=False)))
+        listener.add_channel(CHANGE_CHANNEL, feed.publish)
+        await listener.start()
+        try:
+            await listener.wait_ready(timeout=5)
+
+            hidden_circle = Circle(
+                name="非公開サークル",
+                campus_id=1,
+                category=CircleCategory.SPORTS,
+                is_published=False,
+            )
+            circle = Circle(
+                name="公開サークル",
+                campus_id=1,
+                category=CircleCategory.CULTURE,
+                is_published=True,
+            )
+            db_session.add_all([hidden_circle, circle])
+            await db_session.commit()
+
+            frame = await asyncio.wait_for(subscription.get(), timeout=5)
+            event_line, data_line, *_ = frame.split("\n")
+            assert event_line == "event: circle"
+            assert json.loads(data_line.removeprefix("data: ")) == {
+                "entity": "circle",
+                "op": "insert",
+                "id": str(circle.id),
+            }
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(subscription.get(), timeout=0.2)
+        finally:
+            await listener.stop()
+
+    @pytest.mark.asyncio
+    async def test_multiple_changes_in_one_flush_are_all_notified(
+        self, test_engine: AsyncEngine, db_session: AsyncSession
+    ):
+        """1回のフラッシュに含まれる複数の変更が、まとめて通知される."""
+        feed = ChangeFeed(queue_size=10)
+        subscription = feed.subscribe()
+        listener = PgListener(asyncpg_dsn(test_engine.url.render_as_string(hide_password=False)))
+        listener.add_channel(CHANGE_CHANNEL, feed.publish)
+        await listener.start()
+        try:
+            await listener.wait_ready(timeout=5)
+
+            circles = [
+                Circle(
+                    name=f"公開サークル{i}",
+                    campus_id=1,
+                    category=CircleCategory.CULTURE,
+                    is_published=True,
+                )
+                for i in range(3)
+            ]
+            db_session.add_all(circles)
+            await db_session.commit()
+
+            received = set()
+            for _ in circles:
+                frame = await asyncio.wait_for(subscription.get(), timeout=5)
+                received.add(json.loads(frame.split("\n")[1].removeprefix("data: "))["id"])
+            assert received == {str(circle.id) for circle in circles}
+        finally:
+            await listener.stop()
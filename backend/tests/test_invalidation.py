@@ -0,0 +1,158 @@
+"""Test cases for the cache invalidation bus."""
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import TTLCache
+from app.db.listener import PgListener, asyncpg_dsn
+from app.models.cache import CACHE_GENERATION_SEQUENCES
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services.invalidation import (
+    INVALIDATION_CHANNEL,
+    NAMESPACE_ANNOUNCEMENTS,
+    NAMESPACE_CIRCLES,
+    InvalidationBus,
+)
+
+
+def make_bus(session_factory: sessionmaker) -> InvalidationBus:
+    """テスト用DBを参照する無効化バスを作成する."""
+    return InvalidationBus(session_factory=session_factory, poll_interval=60)
+
+
+def notification(namespace: str, keys: list[str] | None, generation: int) -> str:
+    """無効化通知のペイロードを作成する."""
+    return json.dumps({"ns": namespace, "keys": keys, "gen": generation})
+
+
+class TestInvalidationBus:
+    """InvalidationBus の通知処理のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_notification_evicts_keys(self, session_factory: sessionmaker):
+        """キー単位のキャッシュは通知されたキーのみ破棄され、それ以外は全体が破棄される."""
+        bus = make_bus(session_factory)
+        detail_cache = TTLCache("test_detail", ttl_seconds=60)
+        list_cache = TTLCache("test_list", ttl_seconds=60)
+        bus.register(NAMESPACE_CIRCLES, detail_cache, by_key=True)
+        bus.register(NAMESPACE_CIRCLES, list_cache)
+        detail_cache.set("a", 1)
+        detail_cache.set("b", 2)
+        list_cache.set("page1", [1, 2])
+
+        bus.handle_notification(notification(NAMESPACE_CIRCLES, ["a"], 1))
+
+        assert detail_cache.get("a") is None
+        assert detail_cache.get("b") == 2
+        assert list_cache.get("page1") is None
+        assert bus.generation(NAMESPACE_CIRCLES) == 1
+
+    @pytest.mark.asyncio
+    async def test_generation_gap_clears_namespace(self, session_factory: sessionmaker):
+        """世代番号が飛んでいる場合は、取りこぼしとみなして全体を破棄する."""
+        bus = make_bus(session_factory)
+        detail_cache = TTLCache("test_detail", ttl_seconds=60)
+        bus.register(NAMESPACE_CIRCLES, detail_cache, by_key=True)
+
+        bus.handle_notification(notification(NAMESPACE_CIRCLES, ["a"], 1))
+        detail_cache.set("b", 2)
+        bus.handle_notification(notification(NAMESPACE_CIRCLES, ["a"], 3))
+
+        assert detail_cache.get("b") is None
+        assert bus.generation(NAMESPACE_CIRCLES) == 3
+
+    @pytest.mark.asyncio
+    async def test_evictions_detect_invalidation_during_fetch(self, session_factory: sessionmaker):
+        """取得中に無効化された場合は、前後の破棄回数が一致しない."""
+        bus = make_bus(session_factory)
+        bus.register(NAMESPACE_CIRCLES, TTLCache("test_list", ttl_seconds=60))
+
+        before = bus.evictions(NAMESPACE_CIRCLES, NAMESPACE_ANNOUNCEMENTS)
+        assert bus.evictions(NAMESPACE_CIRCLES, NAMESPACE_ANNOUNCEMENTS) == before
+        # 遅れて届いた古い世代の通知でも、破棄したことは記録される
+        bus.handle_notification(notification(NAMESPACE_CIRCLES, None, 5))
+        bus.handle_notification(notification(NAMESPACE_CIRCLES, None, 4))
+
+        assert bus.evictions(NAMESPACE_CIRCLES, NAMESPACE_ANNOUNCEMENTS) == (
+            before[0] + 2,
+            before[1],
+        )
+        assert bus.generation(NAMESPACE_CIRCLES) == 5
+
+
+class TestInvalidationOnWrite:
+    """書き込み時の無効化のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_write_bumps_generation_and_sync_evicts(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """書き込みで世代番号が進み、通知を受け取れなかったワーカーも同期で破棄する."""
+        bus = make_bus(session_factory)
+        cache = TTLCache("test_list", ttl_seconds=60)
+        bus.register(NAMESPACE_CIRCLES, cache)
+        cache.set("page1", [])
+
+        db_session.add(
+            Circle(name="サークル", campus_id=1, category=CircleCategory.CULTURE, is_published=True)
+        )
+        await db_session.commit()
+
+        sequence = CACHE_GENERATION_SEQUENCES[NAMESPACE_CIRCLES]
+        result = await db_session.execute(text(f"SELECT last_value FROM {sequence.name}"))
+        assert result.scalar_one() == 1
+
+        await bus.sync_generations()
+        assert cache.get("page1") is None
+        assert bus.generation(NAMESPACE_CIRCLES) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_do_not_block(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """世代番号の採番で、同じ名前空間への書き込み同士が待ち合わせない."""
+        async with session_factory() as first, session_factory() as second:
+            first.add(Circle(name="サークル1", campus_id=1, category=CircleCategory.CULTURE))
+            await first.flush()
+            # 1つ目のトランザクションが未コミットでも、2つ目のフラッシュは完了する
+            second.add(Circle(name="サークル2", campus_id=1, category=CircleCategory.CULTURE))
+            await asyncio.wait_for(second.flush(), timeout=5)
+            await second.commit()
+            await first.commit()
+
+    @pytest.mark.asyncio
+    async def test_write_evicts_cache_via_listener(
+        self, test_engine: AsyncEngine, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """コミットすると LISTEN 経由でキャッシュが破棄される."""
+        bus = make_bus(session_factory)
+        cache = TTLCache("test_detail", ttl_seconds=60)
+        bus.register(NAMESPACE_CIRCLES, cache, by_key=True)
+        circle = Circle(name="サークル", campus_id=1, category=CircleCategory.CULTURE)
+        db_session.add(circle)
+        await db_session.commit()
+
+        listener = PgListener(asyncpg_dsn(test_engine.url.render_as_string(hide_password=False)))
+        listener.add_channel(INVALIDATION_CHANNEL, bus.handle_notification)
+        listener.add_reconnect_callback(bus.sync_generations)
+        await listener.start()
+        try:
+            await listener.wait_ready(timeout=5)
+            cache.set(str(circle.id), {"name": "サークル"})
+
+            circle.description = "説明文を更新"
+            await db_session.commit()
+
+            for _ in range(50):
+                if cache.get(str(circle.id)) is None:
+                    break
+                await asyncio.sleep(0.02)
+            assert cache.get(str(circle.id)) is None
+            assert bus.generation(NAMESPACE_CIRCLES) == 2
+        finally:
+            await listener.stop()
@@ -0,0 +1,208 @@
+"""Test cases for the background job queue."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.enums import JobStatus
+from app.models.job import Job
+from app.services.jobs import STALE_JOB_ERROR, JobWorker, enqueue, load_handlers
+
+
+def make_worker(session_factory: sessionmaker, handlers: dict, concurrency: int = 1) -> JobWorker:
+    """テスト用DBを参照するワーカーを作成する."""
+    return JobWorker(
+        session_factory, concurrency=concurrency, poll_interval=0.01, handlers=handlers
+    )
+
+
+async def get_jobs(db_session: AsyncSession) -> list[Job]:
+    """全ジョブを ID 順に取得する."""
+    db_session.expire_all()
+    result = await db_session.execute(select(Job).order_by(Job.id))
+    return list(result.scalars().all())
+
+
+class TestJobWorker:
+    """JobWorker のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_run_one_succeeds(self, session_factory: sessionmaker, db_session: AsyncSession):
+        """ハンドラが成功したジョブは succeeded になる."""
+        received = []
+
+        async def handler(payload: dict) -> None:
+            received.append(payload)
+
+        enqueue(db_session, "test.echo", {"value": 1})
+        await db_session.commit()
+        worker = make_worker(session_factory, {"test.echo": handler})
+
+        assert await worker.run_one() is True
+        assert await worker.run_one() is False
+
+        [job] = await get_jobs(db_session)
+        assert received == [{"value": 1}]
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.attempts == 1
+        assert job.locked_by is None
+        assert job.finished_at is not None
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_retried_then_failed(
+        self, session_factory: sessionmaker, db_session: AsyncSession, monkeypatch
+    ):
+        """失敗したジョブは max_attempts 回まで再実行され、その後 failed になる."""
+        monkeypatch.setattr(settings, "job_retry_base_seconds", 0.0)
+
+        async def handler(payload: dict) -> None:
+            raise ValueError("boom")
+
+        enqueue(db_session, "test.fail", max_attempts=2)
+        await db_session.commit()
+        worker = make_worker(session_factory, {"test.fail": handler})
+
+        assert await worker.run_one() is True
+        [job] = await get_jobs(db_session)
+        assert job.status == JobStatus.QUEUED
+        assert job.attempts == 1
+        assert "boom" in job.last_error
+
+        assert await worker.run_one() is True
+        [job] = await get_jobs(db_session)
+        assert job.status == JobStatus.FAILED
+        assert job.attempts == 2
+        assert await worker.run_one() is False
+
+    @pytest.mark.asyncio
+    async def test_claims_by_priority_and_run_at(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """優先度の高い順に実行し、実行予定日時前のジョブは確保しない."""
+        order = []
+
+        async def handler(payload: dict) -> None:
+            order.append(payload["name"])
+
+        enqueue(db_session, "test.order", {"name": "low"})
+        enqueue(db_session, "test.order", {"name": "high"}, priority=10)
+        enqueue(db_session, "test.order", {"name": "later"}, priority=20, delay=timedelta(hours=1))
+        await db_session.commit()
+        worker = make_worker(session_factory, {"test.order": handler})
+
+        while await worker.run_one():
+            pass
+
+        assert order == ["high", "low"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_workers_do_not_duplicate(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """複数のワーカーが同時に動いても、各ジョブは1回だけ実行される."""
+        processed = []
+
+        async def handler(payload: dict) -> None:
+            processed.append(payload["n"])
+            await asyncio.sleep(0)
+
+        for n in range(30):
+            enqueue(db_session, "test.count", {"n": n})
+        await db_session.commit()
+        workers = [
+            make_worker(session_factory, {"test.count": handler}, concurrency=3) for _ in range(2)
+        ]
+
+        for worker in workers:
+            await worker.start()
+        async with asyncio.timeout(10):
+            while sum(worker.processed for worker in workers) < 30:
+                await asyncio.sleep(0.01)
+        for worker in workers:
+            await worker.stop()
+
+        assert sorted(processed) == list(range(30))
+        jobs = await get_jobs(db_session)
+        assert {job.status for job in jobs} == {JobStatus.SUCCEEDED}
+
+    @pytest.mark.asyncio
+    async def test_requeue_stale(
+        self, session_factory: sessionmaker, db_session: AsyncSession, monkeypatch
+    ):
+        """実行中のまま放置されたジョブは実行待ちに戻る."""
+        monkeypatch.setattr(settings, "job_stale_seconds", 60.0)
+        enqueue(db_session, "test.stale")
+        await db_session.commit()
+        worker = make_worker(session_factory, {"test.stale": lambda payload: None})
+        job = await worker.claim()
+        assert job.status == JobStatus.RUNNING
+
+        assert await worker.requeue_stale() == (0, 0)
+        await db_session.execute(
+            update(Job).values(locked_at=job.locked_at - timedelta(minutes=5))
+        )
+        await db_session.commit()
+        assert await worker.requeue_stale() == (1, 0)
+
+        [job] = await get_jobs(db_session)
+        assert job.status == JobStatus.QUEUED
+        assert job.locked_by is None
+
+    @pytest.mark.asyncio
+    async def test_requeue_stale_fails_exhausted_jobs(
+        self, session_factory: sessionmaker, db_session: AsyncSession, monkeypatch
+    ):
+        """試行回数を使い切ったまま放置されたジョブは再実行せずに failed にする."""
+        monkeypatch.setattr(settings, "job_stale_seconds", 60.0)
+        enqueue(db_session, "test.crash", max_attempts=1)
+        enqueue(db_session, "test.crash", max_attempts=2)
+        await db_session.commit()
+        worker = make_worker(session_factory, {"test.crash": lambda payload: None})
+        await worker.claim()
+        await worker.claim()
+        await db_session.execute(update(Job).values(locked_at=func.now() - timedelta(minutes=5)))
+        await db_session.commit()
+
+        assert await worker.requeue_stale() == (1, 1)
+
+        exhausted, retried = await get_jobs(db_session)
+        assert exhausted.status == JobStatus.FAILED
+        assert exhausted.last_error == STALE_JOB_ERROR
+        assert exhausted.finished_at is not None
+        assert exhausted.locked_by is None
+        assert retried.status == JobStatus.QUEUED
+        assert await worker.run_one() is True
+        assert await worker.run_one() is False
+
+    @pytest.mark.asyncio
+    async def test_purge_finished(
+        self, session_factory: sessionmaker, db_session: AsyncSession, monkeypatch
+    ):
+        """保持期間を過ぎた完了ジョブのみ削除する."""
+        monkeypatch.setattr(settings, "job_retention_seconds", 3600.0)
+        monkeypatch.setattr("app.services.jobs.PURGE_BATCH_SIZE", 2)
+        for status in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.SUCCEEDED):
+            job = enqueue(db_session, "test.done")
+            job.status = status
+            job.finished_at = func.now() - timedelta(hours=2)
+        enqueue(db_session, "test.recent").status = JobStatus.SUCCEEDED
+        enqueue(db_session, "test.queued")
+        await db_session.commit()
+        await db_session.execute(
+            update(Job).where(Job.kind == "test.recent").values(finished_at=func.now())
+        )
+        await db_session.commit()
+        worker = make_worker(session_factory, {})
+
+        assert await worker.purge_finished() == 3
+        assert [job.kind for job in await get_jobs(db_session)] == ["test.recent", "test.queued"]
+        assert await worker.purge_finished() == 0
+
+
+def test_load_handlers():
+    """ハンドラを定義したモジュールを import して登録する."""
+    assert "ogp.render" in load_handlers()
@@ -0,0 +1,296 @@
+"""Test cases for circle membership endpoints."""
+import asyncio
+from uuid import UUID
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.models.circle import Circle, CircleMember, CircleRosterUpdate
+from app.models.enums import CircleCategory
+from app.models.user import User
+from app.services.member import RosterError, update_circle_roster
+
+
+async def create_fixtures(db_session: AsyncSession) -> tuple[Circle, list[User]]:
+    """サークルと一般ユーザー4人を作成する."""
+    circle = Circle(name="テニス部", campus_id=1, category=CircleCategory.SPORTS)
+    users = [
+        User(
+            username=f"user{index}",
+            email=f"user{index}@example.com",
+            sys_role_id=2,
+            auth_user_id=f"user{index}",
+        )
+        for index in range(4)
+    ]
+    db_session.add(circle)
+    db_session.add_all(users)
+    await db_session.commit()
+    return circle, users
+
+
+async def get_roles(db_session: AsyncSession, circle_id: UUID) -> dict[str, int]:
+    """DB上の名簿を メールアドレス → ロールID で取得する."""
+    result = await db_session.execute(
+        select(User.email, CircleMember.role_id)
+        .join(CircleMember, CircleMember.user_id == User.id)
+        .where(CircleMember.circle_id == circle_id)
+    )
+    return dict(result.all())
+
+
+class TestPutCircleMembers:
+    """PUT /api/v1/circles/{id}/members のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_full_roster_replaces_members(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """名簿全体を指定すると、追加・ロール変更・脱退がまとめて反映される."""
+        circle, _ = await create_fixtures(db_session)
+        url = f"/api/v1/circles/{circle.id}/members"
+
+        response = await client.put(
+            url,
+            json={
+                "members": [
+                    {"email": "user0@example.com", "role": "leader"},
+                    {"email": "user1@example.com"},
+                    {"email": "user2@example.com"},
+                ]
+            },
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert [(m["email"], m["role"]) for m in response.json()] == [
+            ("user0@example.com", "leader"),
+            ("user1@example.com", "member"),
+            ("user2@example.com", "member"),
+        ]
+
+        response = await client.put(
+            url,
+            json={
+                "members": [
+                    {"email": "user0@example.com", "role": "leader"},
+                    {"email": "user1@example.com", "role": "editor"},
+                    {"email": "user3@example.com"},
+                ]
+            },
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert await get_roles(db_session, circle.id) == {
+            "user0@example.com": 1,
+            "user1@example.com": 2,
+            "user3@example.com": 3,
+        }
+
+    @pytest.mark.asyncio
+    async def test_diff_applies_only_changes(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """差分指定では、指定したメンバーだけが変更される."""
+        circle, users = await create_fixtures(db_session)
+        db_session.add_all(
+            [
+                CircleMember(circle_id=circle.id, user_id=users[0].id, role_id=1),
+                CircleMember(circle_id=circle.id, user_id=users[1].id, role_id=3),
+                CircleMember(circle_id=circle.id, user_id=users[3].id, role_id=3),
+            ]
+        )
+        await db_session.commit()
+
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}/members",
+            json={
+                "upsert": [
+                    {"email": "user1@example.com", "role": "editor"},
+                    {"email": "user2@example.com"},
+                ],
+                "remove": ["user3@example.com"],
+            },
+            headers=admin_headers,
+        )
+        assert response.status_code == 200
+        assert await get_roles(db_session, circle.id) == {
+            "user0@example.com": 1,
+            "user1@example.com": 2,
+            "user2@example.com": 3,
+        }
+
+    @pytest.mark.asyncio
+    async def test_unknown_email_rolls_back(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """存在しないユーザーが含まれる場合は 422 を返し、何も変更しない."""
+        circle, users = await create_fixtures(db_session)
+        circle_id = circle.id
+        db_session.add(CircleMember(circle_id=circle_id, user_id=users[0].id, role_id=1))
+        await db_session.commit()
+
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}/members",
+            json={"members": [{"email": "user1@example.com"}, {"email": "nobody@example.com"}]},
+            headers=admin_headers,
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"]["values"] == ["nobody@example.com"]
+        assert await get_roles(db_session, circle_id) == {"user0@example.com": 1}
+
+    @pytest.mark.asyncio
+    async def test_unknown_role(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """存在しないロールが含まれる場合は 422 を返す."""
+        circle, _ = await create_fixtures(db_session)
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}/members",
+            json={"upsert": [{"email": "user0@example.com", "role": "owner"}]},
+            headers=admin_headers,
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"]["values"] == ["owner"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"members": [], "remove": ["user0@example.com"]},
+            {"upsert": [{"email": "user0@example.com"}], "remove": ["user0@example.com"]},
+        ],
+    )
+    async def test_invalid_body(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str], body
+    ):
+        """全体指定と差分指定の併用・重複指定は 422 を返す."""
+        circle, _ = await create_fixtures(db_session)
+        response = await client.put(
+            f"/api/v1/circles/{circle.id}/members", json=body, headers=admin_headers
+        )
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_circle_not_found(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str]
+    ):
+        """存在しないサークルは 404 を返す."""
+        await create_fixtures(db_session)
+        response = await client.put(
+            "/api/v1/circles/00000000-0000-0000-0000-000000000000/members",
+            json={"members": []},
+            headers=admin_headers,
+        )
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"members": []},
+            {"members": [{"email": "user1@example.com", "role": "editor"}]},
+            {"remove": ["user0@example.com"]},
+            {"upsert": [{"email": "user0@example.com", "role": "member"}]},
+        ],
+    )
+    async def test_rejects_roster_without_leader(
+        self, client: AsyncClient, db_session: AsyncSession, admin_headers: dict[str, str], body
+    ):
+        """代表者が1人もいなくなる名簿は 422 を返し、何も変更しない."""
+        circle, users = await create_fixtures(db_session)
+        circle_id = circle.id
+        db_session.add_all(
+            [
+                CircleMember(circle_id=circle_id, user_id=users[0].id, role_id=1),
+                CircleMember(circle_id=circle_id, user_id=users[1].id, role_id=3),
+            ]
+        )
+        await db_session.commit()
+
+        response = await client.put(
+            f"/api/v1/circles/{circle_id}/members", json=body, headers=admin_headers
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"]["message"] == "Circle must have at least one leader"
+        assert await get_roles(db_session, circle_id) == {
+            "user0@example.com": 1,
+            "user1@example.com": 3,
+        }
+
+    @pytest.mark.asyncio
+    async def test_requires_circle_editor(
+        self, client: AsyncClient, db_session: AsyncSession, auth_headers
+    ):
+        """当該サークルの Leader / Editor と SystemAdmin 以外は更新できない."""
+        circle, users = await create_fixtures(db_session)
+        other = Circle(name="野球部", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(other)
+        await db_session.flush()
+        db_session.add_all(
+            [
+                CircleMember(circle_id=circle.id, user_id=users[0].id, role_id=1),
+                CircleMember(circle_id=circle.id, user_id=users[1].id, role_id=2),
+                CircleMember(circle_id=circle.id, user_id=users[2].id, role_id=3),
+                CircleMember(circle_id=other.id, user_id=users[3].id, role_id=1),
+            ]
+        )
+        await db_session.commit()
+        url = f"/api/v1/circles/{circle.id}/members"
+        body = {"upsert": [{"email": "user3@example.com"}]}
+
+        response = await client.put(url, json=body)
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+        response = await client.put(url, json=body, headers={"Authorization": "Bearer invalid"})
+        assert response.status_code == 401
+        # 一般メンバー・他のサークルの代表者
+        for user in ("user2", "user3"):
+            response = await client.put(url, json=body, headers=auth_headers(user))
+            assert response.status_code == 403
+        assert "user3@example.com" not in await get_roles(db_session, circle.id)
+
+        # 幹部
+        response = await client.put(url, json=body, headers=auth_headers("user1"))
+        assert response.status_code == 200
+        assert "user3@example.com" in await get_roles(db_session, circle.id)
+
+
+class TestUpdateCircleRoster:
+    """update_circle_roster の同時実行のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_keep_a_leader(
+        self, session_factory: sessionmaker, db_session: AsyncSession
+    ):
+        """別々の代表者を同時に外しても、後の更新は先の更新の結果を見て拒否される."""
+        circle, users = await create_fixtures(db_session)
+        db_session.add_all(
+            [
+                CircleMember(circle_id=circle.id, user_id=users[0].id, role_id=1),
+                CircleMember(circle_id=circle.id, user_id=users[1].id, role_id=1),
+            ]
+        )
+        await db_session.commit()
+
+        async with session_factory() as first, session_factory() as second:
+            await update_circle_roster(
+                first, circle.id, CircleRosterUpdate(remove=["user0@example.com"])
+            )
+            # 先の更新がコミットされるまで、後の更新は待たされる
+            task = asyncio.create_task(
+                update_circle_roster(
+                    second, circle.id, CircleRosterUpdate(remove=["user1@example.com"])
+                )
+            )
+            await asyncio.sleep(0.2)
+            assert not task.done()
+            await first.commit()
+
+            with pytest.raises(RosterError):
+                await task
+            await second.rollback()
+
+        assert await get_roles(db_session, circle.id) == {"user1@example.com": 1}
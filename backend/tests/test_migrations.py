@@ -0,0 +1,66 @@
+"""Test cases for database migrations."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.db.session import upgrade_schema
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+
+
+@pytest.fixture
+async def migrated_engine(test_engine: AsyncEngine, db_session: AsyncSession):
+    """マイグレーションを実行するテスト用エンジン (適用済みのリビジョンは後で削除する)."""
+    yield test_engine
+    async with test_engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+
+async def column_names(engine: AsyncEngine, table: str) -> set[str]:
+    """テーブルのカラム名."""
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT column_name FROM information_schema.columns WHERE table_name = :table"),
+            {"table": table},
+        )
+        return set(result.scalars())
+
+
+class TestUpgradeSchema:
+    """upgrade_schema (alembic upgrade head) のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_adds_columns_to_existing_tables(
+        self, migrated_engine: AsyncEngine, db_session: AsyncSession
+    ):
+        """カラムがない既存のデータベースに追加され、既存の行は既定値になる."""
+        circle = Circle(name="LinuxClub", campus_id=1, category=CircleCategory.CULTURE)
+        db_session.add(circle)
+        await db_session.commit()
+        # カラムを追加する前に作成されたデータベースを再現する
+        async with migrated_engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE circles DROP COLUMN version"))
+            await conn.execute(text("ALTER TABLE circles DROP COLUMN name_search_key"))
+            await conn.execute(text("ALTER TABLE announcements DROP COLUMN version"))
+
+        async with migrated_engine.begin() as conn:
+            await conn.run_sync(upgrade_schema)
+
+        assert {"version", "name_search_key"} <= await column_names(migrated_engine, "circles")
+        assert "version" in await column_names(migrated_engine, "announcements")
+        async with migrated_engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT version, name_search_key FROM circles WHERE id = :id"),
+                {"id": circle.id},
+            )
+        assert result.one() == (1, "")
+
+    @pytest.mark.asyncio
+    async def test_new_database(self, migrated_engine: AsyncEngine):
+        """create_all で作成したばかりのデータベースにも適用でき、2回目は何もしない."""
+        for _ in range(2):
+            async with migrated_engine.begin() as conn:
+                await conn.run_sync(upgrade_schema)
+        async with migrated_engine.connect() as conn:
+            revision = await conn.scalar(text("SELECT version_num FROM alembic_version"))
+        assert revision == "0001"
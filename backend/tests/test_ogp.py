@@ -0,0 +1,211 @@
+"""Test cases for OGP image endpoints."""
+from datetime import UTC, datetime
+from io import BytesIO
+from pathlib import Path
+from uuid import uuid7
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.circle import Circle
+from app.models.enums import CircleCategory
+from app.services import ogp
+from app.services.ogp import (
+    OgpFontUnavailableError,
+    check_ogp_font,
+    render_ogp_job,
+    shutdown_ogp_renderer,
+)
+
+DEJAVU_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+@pytest.fixture
+def ogp_cache_dir(tmp_path, monkeypatch):
+    """OGP画像のキャッシュ先を一時ディレクトリにする."""
+    monkeypatch.setattr(settings, "ogp_cache_dir", str(tmp_path))
+    yield tmp_path
+    shutdown_ogp_renderer()
+
+
+@pytest.fixture
+def ogp_font(monkeypatch):
+    """描画に使うフォントを用意する (CJK フォントがない環境では DejaVu Sans で代用する)."""
+    try:
+        check_ogp_font()
+    except OgpFontUnavailableError:
+        if not Path(DEJAVU_FONT).is_file():
+            pytest.skip("No font is installed")
+        monkeypatch.setattr(settings, "ogp_font_path", DEJAVU_FONT)
+        monkeypatch.setattr(ogp, "_verify_font", lambda path: None)
+
+
+@pytest.fixture
+def no_ogp_font(monkeypatch):
+    """日本語を描画できるフォントがない状態にする."""
+    monkeypatch.setattr(settings, "ogp_font_path", None)
+    monkeypatch.setattr(ogp, "FONT_CANDIDATES", ())
+
+
+class TestGetCircleOgpImage:
+    """GET /api/v1/circles/{id}/ogp.png のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_get_ogp_image_not_found(self, client: AsyncClient, ogp_cache_dir):
+        """存在しないサークルの場合、404が返る."""
+        response = await client.get(f"/api/v1/circles/{uuid7()}/ogp.png")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_get_ogp_image_unpublished(
+        self, client: AsyncClient, db_session: AsyncSession, ogp_cache_dir
+    ):
+        """非公開サークルの場合、404が返る."""
+        circle = Circle(name="非公開サークル", campus_id=1, category=CircleCategory.SPORTS)
+        db_session.add(circle)
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}/ogp.png")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_get_ogp_image_renders_and_caches(
+        self, client: AsyncClient, db_session: AsyncSession, ogp_cache_dir, ogp_font
+    ):
+        """画像が生成され、サークルが更新されるまではキャッシュが使われる."""
+        circle = Circle(
+            name="LinuxClub",
+            campus_id=2,
+            category=CircleCategory.CULTURE,
+            is_published=True,
+        )
+        db_session.add(circle)
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}/ogp.png")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        with Image.open(BytesIO(response.content)) as image:
+            assert image.size == (1200, 630)
+        etag = response.headers["etag"]
+
+        # 2回目はキャッシュ済みの画像が返り、ファイルは増えない
+        response = await client.get(f"/api/v1/circles/{circle.id}/ogp.png")
+        assert response.headers["etag"] == etag
+        assert len(list(ogp_cache_dir.glob("*.png"))) == 1
+
+        # 条件付きリクエストには 304 を返す (複数指定・弱い ETag でも一致する)
+        for if_none_match in (etag, f'"other", W/{etag}', "*"):
+            response = await client.get(
+                f"/api/v1/circles/{circle.id}/ogp.png", headers={"If-None-Match": if_none_match}
+            )
+            assert response.status_code == 304
+        response = await client.get(
+            f"/api/v1/circles/{circle.id}/ogp.png", headers={"If-None-Match": '"other"'}
+        )
+        assert response.status_code == 200
+
+        # サークルを更新すると再生成される
+        circle.name = "LinuxClub 2"
+        await db_session.commit()
+        response = await client.get(f"/api/v1/circles/{circle.id}/ogp.png")
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        # 古い画像は削除される
+        key = response.headers["etag"].strip('"')
+        assert [path.name for path in ogp_cache_dir.glob("*.png")] == [f"{circle.id}_{key}.png"]
+
+
+    @pytest.mark.asyncio
+    async def test_get_ogp_image_without_font(
+        self, client: AsyncClient, db_session: AsyncSession, ogp_cache_dir, no_ogp_font
+    ):
+        """日本語を描画できるフォントがない場合は 503 が返り、画像は生成されない."""
+        circle = Circle(
+            name="LinuxClub",
+            campus_id=2,
+            category=CircleCategory.CULTURE,
+            is_published=True,
+        )
+        db_session.add(circle)
+        await db_session.commit()
+
+        response = await client.get(f"/api/v1/circles/{circle.id}/ogp.png")
+        assert response.status_code == 503
+        assert list(ogp_cache_dir.glob("*.png")) == []
+
+
+class TestRenderOgpJob:
+    """ogp.render ジョブのテスト."""
+
+    @pytest.fixture
+    def job_session(self, session_factory: sessionmaker, monkeypatch):
+        """ジョブがテスト用DBを使うようにする."""
+        monkeypatch.setattr(ogp, "async_session", session_factory)
+
+    @pytest.mark.asyncio
+    async def test_renders_image(
+        self, db_session: AsyncSession, ogp_cache_dir, ogp_font, job_session
+    ):
+        """サークルのOGP画像を事前に生成する."""
+        circle = Circle(name="LinuxClub", campus_id=1, category=CircleCategory.CULTURE)
+        db_session.add(circle)
+        await db_session.commit()
+
+        await render_ogp_job({"circle_id": str(circle.id)})
+        assert len(list(ogp_cache_dir.glob(f"{circle.id}_*.png"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_skips_deleted_circle(
+        self, db_session: AsyncSession, ogp_cache_dir, ogp_font, job_session
+    ):
+        """削除済みのサークルの画像は生成しない."""
+        circle = Circle(
+            name="LinuxClub",
+            campus_id=1,
+            category=CircleCategory.CULTURE,
+            deleted_at=datetime(2024, 1, 1, 0, 0, 0, tzinfo=UTC),
+        )
+        db_session.add(circle)
+        await db_session.commit()
+
+        await render_ogp_job({"circle_id": str(circle.id)})
+        assert list(ogp_cache_dir.glob("*.png")) == []
+
+    @pytest.mark.asyncio
+    async def test_skips_without_font(
+        self, db_session: AsyncSession, ogp_cache_dir, no_ogp_font, job_session
+    ):
+        """日本語を描画できるフォントがない場合は、失敗させずに何もしない."""
+        circle = Circle(name="LinuxClub", campus_id=1, category=CircleCategory.CULTURE)
+        db_session.add(circle)
+        await db_session.commit()
+
+        await render_ogp_job({"circle_id": str(circle.id)})
+        assert list(ogp_cache_dir.glob("*.png")) == []
+
+
+class TestCheckOgpFont:
+    """check_ogp_font のテスト."""
+
+    def test_missing_font(self, monkeypatch, tmp_path):
+        """指定したフォントが存在しない場合はエラーになる."""
+        monkeypatch.setattr(settings, "ogp_font_path", str(tmp_path / "missing.ttf"))
+        with pytest.raises(OgpFontUnavailableError, match="Cannot load"):
+            check_ogp_font()
+
+    @pytest.mark.skipif(not Path(DEJAVU_FONT).is_file(), reason="DejaVu Sans is not installed")
+    def test_font_without_cjk_glyphs(self, monkeypatch):
+        """日本語のグリフがないフォントではエラーになる."""
+        monkeypatch.setattr(settings, "ogp_font_path", DEJAVU_FONT)
+        with pytest.raises(OgpFontUnavailableError, match="cannot render Japanese"):
+            check_ogp_font()
+
+    def test_no_font_found(self, no_ogp_font):
+        """未指定で既知の CJK フォントもない場合はエラーになる."""
+        with pytest.raises(OgpFontUnavailableError, match="No CJK font"):
+            check_ogp_font()
@@ -0,0 +1,262 @@
+"""Test cases for rate limiting."""
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.config import Settings
+from app.core.ratelimit import (
+    ExpiringTimes,
+    LocalBucketStore,
+    PostgresBucketStore,
+    RateLimitMiddleware,
+    RateLimitRule,
+    find_rule,
+    gcra,
+    parse_rules,
+)
+from app.models.ratelimit import RateLimitBucket
+
+
+def make_rule(rate: float = 1.0, burst: int = 3) -> RateLimitRule:
+    return RateLimitRule(name="test", method="*", prefix="/", rate=rate, burst=burst)
+
+
+def make_postgres_store(test_engine: AsyncEngine) -> PostgresBucketStore:
+    """テスト用DBに専用のプールで接続するストア."""
+    return PostgresBucketStore(test_engine.url.render_as_string(hide_password=False))
+
+
+class TestParseRules:
+    """parse_rules / find_rule のテスト."""
+
+    def test_more_specific_rule_wins(self):
+        """パスの長いルール・メソッド指定のあるルールが優先される."""
+        rules = parse_rules(
+            {
+                "* /api/v1": "10/50",
+                "GET /api/v1/circles": "5/30",
+                "* /api/v1/circles": "2/4",
+                "GET /api/v1/circles/suggest": "10/40",
+            }
+        )
+
+        assert find_rule(rules, "GET", "/api/v1/circles/suggest").name == (
+            "GET /api/v1/circles/suggest"
+        )
+        assert find_rule(rules, "GET", "/api/v1/circles").name == "GET /api/v1/circles"
+        assert find_rule(rules, "PUT", "/api/v1/circles/x").name == "* /api/v1/circles"
+        assert find_rule(rules, "GET", "/api/v1/circlesx").name == "* /api/v1"
+        assert find_rule(rules, "GET", "/health") is None
+
+    @pytest.mark.parametrize(
+        ("target", "limit"),
+        [("GET api", "1/1"), ("GET /api", "0/1"), ("GET /api", "1/0"), ("GET /api", "x")],
+    )
+    def test_invalid_rule(self, target, limit):
+        """不正なルールはエラーにする."""
+        with pytest.raises(ValueError):
+            parse_rules({target: limit})
+
+    def test_invalid_backend(self):
+        """バケットの保存先に local / postgres 以外を指定すると設定の読み込み時にエラーになる."""
+        assert Settings(rate_limit_backend="postgres").rate_limit_backend == "postgres"
+        with pytest.raises(ValidationError):
+            Settings(rate_limit_backend="redis")
+
+    def test_gcra(self):
+        """容量分までは許可し、超えた分は次のトークンまでの待ち時間を返す."""
+        rule = make_rule(rate=2.0, burst=2)
+        assert gcra(0.0, 100.0, rule) == (100.5, 0.0)
+        assert gcra(100.5, 100.0, rule) == (101.0, 0.0)
+        assert gcra(101.0, 100.0, rule) == (101.5, pytest.approx(0.5))
+
+
+class TestExpiringTimes:
+    """ExpiringTimes のテスト."""
+
+    def test_expired_entries_are_dropped(self):
+        """期限切れのエントリは取得できず、更新時に破棄される."""
+        times = ExpiringTimes(max_entries=10)
+        times.set("a", 5.0, now=0.0)
+        times.set("b", 20.0, now=0.0)
+
+        assert times.get("a", now=4.0) == 5.0
+        assert times.get("a", now=6.0) is None
+
+        times.set("c", 30.0, now=10.0)
+        assert len(times) == 2
+
+    def test_max_entries(self):
+        """上限を超えた場合は最も長く更新されていないエントリから破棄する."""
+        times = ExpiringTimes(max_entries=2)
+        times.set("a", 100.0, now=0.0)
+        times.set("b", 100.0, now=0.0)
+        times.set("a", 100.0, now=0.0)
+        times.set("c", 100.0, now=0.0)
+
+        assert len(times) == 2
+        assert times.get("b", now=0.0) is None
+        assert times.get("a", now=0.0) == 100.0
+
+
+class TestLocalBucketStore:
+    """LocalBucketStore のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_then_rejects(self):
+        """容量分は連続して許可し、超えた分は待ち時間を返す."""
+        store = LocalBucketStore()
+        rule = make_rule(rate=1.0, burst=3)
+
+        assert [await store.take("client", rule) for _ in range(3)] == [0.0, 0.0, 0.0]
+        retry_after = await store.take("client", rule)
+        assert 0 < retry_after <= 1.0
+        # 別のクライアントは影響を受けない
+        assert await store.take("other", rule) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_refills_over_time(self, monkeypatch):
+        """時間が経つとトークンが補充される."""
+        now = [1000.0]
+        monkeypatch.setattr("app.core.ratelimit.time.monotonic", lambda: now[0])
+        store = LocalBucketStore()
+        rule = make_rule(rate=2.0, burst=2)
+
+        assert await store.take("client", rule) == 0.0
+        assert await store.take("client", rule) == 0.0
+        assert await store.take("client", rule) == pytest.approx(0.5)
+
+        now[0] += 0.5
+        assert await store.take("client", rule) == 0.0
+        # 満タンに戻ったバケットは破棄される
+        now[0] += 10.0
+        await store.take("other", rule)
+        assert len(store) == 1
+
+
+class TestPostgresBucketStore:
+    """PostgresBucketStore のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_then_rejects(
+        self, test_engine: AsyncEngine, db_session: AsyncSession
+    ):
+        """全ワーカー共通のバケットで容量分を許可し、拒否したクライアントはDBに問い合わせない."""
+        store = make_postgres_store(test_engine)
+        rule = make_rule(rate=1.0, burst=2)
+
+        assert await store.take("client", rule) == 0.0
+        assert await store.take("client", rule) == 0.0
+        retry_after = await store.take("client", rule)
+        assert 0 < retry_after <= 1.0
+
+        # 別のワーカー (ストア) からも同じバケットが見える
+        other_worker = make_postgres_store(test_engine)
+        assert await other_worker.take("client", rule) > 0
+        await other_worker.close()
+
+        bucket = (
+            await db_session.execute(select(RateLimitBucket).where(RateLimitBucket.key == "client"))
+        ).scalar_one()
+        tat = bucket.tat
+
+        # 拒否中はワーカー内で判定するため、DBは更新されない
+        await store.take("client", rule)
+        db_session.expire_all()
+        bucket = (
+            await db_session.execute(select(RateLimitBucket).where(RateLimitBucket.key == "client"))
+        ).scalar_one()
+        assert bucket.tat == tat
+        await store.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_takes_do_not_exceed_burst(
+        self, test_engine: AsyncEngine, db_session: AsyncSession
+    ):
+        """複数のワーカーが同時に判定しても、許可するのは容量分だけ."""
+        stores = [make_postgres_store(test_engine) for _ in range(4)]
+        rule = make_rule(rate=0.01, burst=5)
+
+        results = await asyncio.gather(
+            *(store.take("client", rule) for store in stores for _ in range(5))
+        )
+
+        assert results.count(0.0) == 5
+        assert all(retry_after > 0 for retry_after in results if retry_after != 0.0)
+        for store in stores:
+            await store.close()
+
+
+class TestRateLimitMiddleware:
+    """RateLimitMiddleware のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_returns_429_before_reaching_app(self):
+        """上限を超えたリクエストはアプリケーションに渡さずに 429 を返す."""
+        calls = []
+
+        async def endpoint(request):
+            calls.append(request.url.path)
+            return PlainTextResponse("ok")
+
+        inner = Starlette(routes=[Route("/limited", endpoint), Route("/free", endpoint)])
+        app = RateLimitMiddleware(
+            inner,
+            rules=parse_rules({"GET /limited": "1/2"}),
+            store=LocalBucketStore(),
+        )
+
+        async with AsyncClient(
+            transport=ASGITransport(app=app, client=("203.0.113.1", 1234)),
+            base_url="http://test",
+        ) as client:
+            assert (await client.get("/limited")).status_code == 200
+            assert (await client.get("/limited")).status_code == 200
+            response = await client.get("/limited")
+            # 対象外のパスは制限しない
+            for _ in range(5):
+                assert (await client.get("/free")).status_code == 200
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert response.json() == {"detail": "Too Many Requests"}
+        assert calls.count("/limited") == 2
+
+        # 別のクライアントIPは別のバケット
+        async with AsyncClient(
+            transport=ASGITransport(app=app, client=("203.0.113.2", 1234)),
+            base_url="http://test",
+        ) as client:
+            assert (await client.get("/limited")).status_code == 200
+
+    @pytest.mark.parametrize(
+        ("peer", "header", "expected"),
+        [
+            # 信頼するプロキシからのリクエストは、プロキシが末尾に追加した値を使う
+            ("10.0.0.5", "198.51.100.1, 203.0.113.7", "203.0.113.7"),
+            ("10.0.0.5", None, "10.0.0.5"),
+            # それ以外の接続元が付けたヘッダーは無視する
+            ("192.0.2.1", "203.0.113.7", "192.0.2.1"),
+        ],
+    )
+    def test_client_ip_from_trusted_proxy(self, peer, header, expected):
+        """クライアントIPのヘッダーは信頼するプロキシからの場合のみ使う."""
+        middleware = RateLimitMiddleware(
+            Starlette(),
+            rules=[],
+            store=LocalBucketStore(),
+            client_ip_header="X-Forwarded-For",
+            trusted_proxies=["10.0.0.0/8"],
+        )
+        headers = [(b"x-forwarded-for", header.encode())] if header else []
+        scope = {"type": "http", "client": (peer, 1234), "headers": headers}
+
+        assert middleware.client_ip(scope) == expected
+
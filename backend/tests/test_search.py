@@ -0,0 +1,20 @@
+"""Test cases for search text normalization."""
+import pytest
+
+from app.core.search import normalize_search_key
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("リナックス", "りなっくす"),  # カタカナ → ひらがな
+        ("ﾘﾅｯｸｽ", "りなっくす"),  # 半角カナ → ひらがな
+        ("ＬｉｎｕｘＣｌｕｂ", "linuxclub"),  # 全角英字 → 半角小文字
+        ("LinuxClub", "linuxclub"),
+        ("サッカー部", "さっかー部"),  # 漢字・長音はそのまま
+        ("  軽音楽部 ", "軽音楽部"),
+    ],
+)
+def test_normalize_search_key(text: str, expected: str):
+    """表記揺れが同じ正規化キーにまとまる."""
+    assert normalize_search_key(text) == expected
@@ -0,0 +1,260 @@
+"""Test cases for the pre-fork server and cache warm-up."""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import server
+from app.models.master import CircleRole
+from app.services.invalidation import NAMESPACE_MASTER, invalidation_bus
+from app.services.master import get_master_data, master_cache
+from app.services.ranking import recent_circles_cache
+from app.services.suggest import suggest_cache
+from app.services.warmup import warm_caches, warm_connection_pool
+
+
+class TestPreforkServer:
+    """PreforkServer の設定値のテスト."""
+
+    def test_default_worker_count(self, monkeypatch):
+        """ワーカー数の既定値は CPU 数 (取得できない場合は1)."""
+        monkeypatch.setattr(server.os, "process_cpu_count", lambda: 8, raising=False)
+        assert server.default_worker_count() == 8
+        monkeypatch.setattr(server.os, "process_cpu_count", lambda: None, raising=False)
+        assert server.default_worker_count() == 1
+
+    def test_recycle_offsets_are_staggered(self):
+        """初回の入れ替え時刻は lifetime の間に均等にずれる."""
+        assert server.recycle_offsets(4, 400.0) == [100.0, 200.0, 300.0, 400.0]
+
+
+class TestWarmup:
+    """キャッシュの事前作成のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_warm_caches(
+        self, session_factory: sessionmaker, db_session: AsyncSession, monkeypatch
+    ):
+        """マスタデータ・ランキング・入力補完の索引がキャッシュされる."""
+        monkeypatch.setattr(invalidation_bus, "session_factory", session_factory)
+        master_cache.clear()
+        recent_circles_cache.clear()
+        suggest_cache.clear()
+
+        await warm_caches(session_factory)
+
+        assert master_cache.get("all") is not None
+        assert len(recent_circles_cache) > 0
+        assert suggest_cache.get("index") is not None
+
+    @pytest.mark.asyncio
+    async def test_warm_connection_pool(self, test_engine: AsyncEngine, db_session: AsyncSession):
+        """指定した本数の接続を張れる."""
+        await warm_connection_pool(2, test_engine)
+
+
+class TestMasterData:
+    """マスタデータのキャッシュのテスト."""
+
+    @pytest.mark.asyncio
+    async def test_master_data_is_cached_and_invalidated(self, db_session: AsyncSession):
+        """マスタデータはキャッシュされ、書き込みがあれば破棄される."""
+        master_cache.clear()
+        master = await get_master_data(db_session)
+        assert master.campuses == {1: "hachioji", 2: "kamata"}
+        assert master.circle_roles == {"leader": 1, "editor": 2, "member": 3}
+        assert await get_master_data(db_session) is master
+
+        db_session.add(CircleRole(id=4, name="Advisor", code="advisor"))
+        await db_session.commit()
+        # コミット時に配送される無効化通知を受け取ったものとする
+        generation = invalidation_bus.generation(NAMESPACE_MASTER) + 1
+        invalidation_bus.handle_notification(
+            json.dumps({"ns": NAMESPACE_MASTER, "keys": ["circle_roles"], "gen": generation})
+        )
+
+        assert (await get_master_data(db_session)).circle_roles["advisor"] == 4
+
+
+# 最小限のアプリで PreforkServer を起動するスクリプト (待ち受けポートを標準出力に書く)
+PREFORK_SCRIPT = """
+import functools
+import os
+import socket
+import sys
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.server import PreforkServer, serve_app
+
+
+async def pid(request):
+    return PlainTextResponse(str(os.getpid()))
+
+
+app = Starlette(routes=[Route("/", pid)])
+sock = socket.create_server(("127.0.0.1", 0))
+sock.set_inheritable(True)
+print(sock.getsockname()[1], flush=True)
+PreforkServer(
+    sock,
+    workers=1,
+    lifetime=0,
+    ready_timeout=10.0,
+    graceful_timeout=5.0,
+    worker_main=functools.partial(serve_app, app),
+).run()
+"""
+
+
+def wait_for_worker(port: int, exclude: int | None = None, timeout: float = 15.0) -> int:
+    """ワーカーが応答するまで待ち、その PID を返す (exclude 以外の PID になるまで待つ)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            worker_pid = int(httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).text)
+        except httpx.HTTPError:
+            worker_pid = None
+        if worker_pid is not None and worker_pid != exclude:
+            return worker_pid
+        time.sleep(0.1)
+    raise AssertionError("worker did not respond")
+
+
+def process_exists(pid: int) -> bool:
+    """プロセスが存在するか (回収済みの子プロセスは存在しない)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+class TestPreforkProcesses:
+    """実際に fork して PreforkServer を動かすテスト."""
+
+    def test_respawns_killed_worker_and_stops_on_sigterm(self):
+        """強制終了したワーカーは起動し直され、SIGTERM で全プロセスが終了する."""
+        parent = subprocess.Popen(
+            [sys.executable, "-c", PREFORK_SCRIPT],
+            cwd=Path(__file__).resolve().parents[1],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            port = int(parent.stdout.readline())
+            first = wait_for_worker(port)
+
+            os.kill(first, signal.SIGKILL)
+            second = wait_for_worker(port, exclude=first)
+            assert second != first
+
+            parent.send_signal(signal.SIGTERM)
+            assert parent.wait(timeout=10) == 0
+            assert not process_exists(second)
+        finally:
+            if parent.poll() is None:
+                parent.kill()
+                parent.wait()
+
+
+# 変更フィード (SSE) だけのアプリを serve_app で起動するスクリプト (待ち受けポートを標準出力に書く)
+SSE_SCRIPT = """
+import asyncio
+import os
+import socket
+
+from fastapi import FastAPI
+
+from app.api.v1.endpoints import events
+from app.server import serve_app
+
+app = FastAPI()
+app.include_router(events.router, prefix="/events")
+sock = socket.create_server(("127.0.0.1", 0))
+print(sock.getsockname()[1], flush=True)
+_, ready_fd = os.pipe()
+asyncio.run(serve_app(app, sock, ready_fd))
+"""
+
+
+class TestGracefulShutdown:
+    """停止時に処理中のリクエストを待ち続けないことのテスト."""
+
+    def test_retiring_worker_is_killed_after_graceful_timeout(self):
+        """停止を指示しても終了しないワーカーは、graceful_timeout 経過後に強制終了される."""
+        worker = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+                "print(flush=True); time.sleep(60)",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            worker.stdout.readline()
+            prefork = server.PreforkServer(
+                socket.socket(), workers=1, lifetime=0, ready_timeout=10.0, graceful_timeout=0.2
+            )
+            prefork._children[worker.pid] = server.Worker(
+                pid=worker.pid,
+                slot=0,
+                ready_fd=-1,
+                started_at=time.monotonic(),
+                recycle_at=time.monotonic(),
+                ready=True,
+            )
+
+            prefork._retire(worker.pid)
+            prefork._recycle()
+            with pytest.raises(subprocess.TimeoutExpired):
+                worker.wait(timeout=0.5)
+
+            time.sleep(0.2)
+            prefork._recycle()
+            assert worker.wait(timeout=5) == -signal.SIGKILL
+        finally:
+            if worker.poll() is None:
+                worker.kill()
+                worker.wait()
+            worker.stdout.close()
+
+    def test_sse_stream_ends_on_shutdown(self):
+        """停止が始まると SSE のレスポンスが完了し、graceful_timeout を待たずに終了する."""
+        process = subprocess.Popen(
+            [sys.executable, "-c", SSE_SCRIPT],
+            cwd=Path(__file__).resolve().parents[1],
+            stdout=subprocess.PIPE,
+            text=True,
+            env={**os.environ, "SERVER_GRACEFUL_TIMEOUT_SECONDS": "30"},
+        )
+        try:
+            port = int(process.stdout.readline())
+            with httpx.stream("GET", f"http://127.0.0.1:{port}/events", timeout=10.0) as response:
+                lines = response.iter_lines()
+                assert next(lines) == "retry: 3000"
+                started = time.monotonic()
+                process.send_signal(signal.SIGTERM)
+                # 購読が終了してレスポンスが完了する
+                assert list(lines) == [""]
+            # uvicorn は受け取った SIGTERM を停止後に送り直すため、終了コードは問わない
+            process.wait(timeout=10)
+            assert time.monotonic() - started < 10
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
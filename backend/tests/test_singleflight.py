@@ -0,0 +1,123 @@
+"""Test cases for request coalescing."""
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight, coalesced_requests
+
+
+class TestSingleFlight:
+    """SingleFlight のテスト."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """同じキーの同時呼び出しは1回だけ実行され、結果が共有される."""
+        flight = SingleFlight("test_share")
+        calls = 0
+        release = asyncio.Event()
+
+        async def query():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return ["result"]
+
+        tasks = [asyncio.create_task(flight.do("key", query)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert results == [["result"]] * 5
+        assert coalesced_requests.value(name="test_share") == 4
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """異なるキーの呼び出しはまとめられない."""
+        flight = SingleFlight("test_keys")
+
+        async def query(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: query("a")),
+            flight.do("b", lambda: query("b")),
+        )
+        assert results == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared_and_not_cached(self):
+        """例外は全ての待機者に伝わり、次の呼び出しは再実行される."""
+        flight = SingleFlight("test_error")
+        calls = 0
+        release = asyncio.Event()
+
+        async def failing_query():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            raise RuntimeError("db error")
+
+        tasks = [asyncio.create_task(flight.do("key", failing_query)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        release.clear()
+        release.set()
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing_query)
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_leader_cancellation_promotes_waiter(self):
+        """リーダーがキャンセルされると、待機者が処理をやり直して結果を得る."""
+        flight = SingleFlight("test_leader_cancel")
+        calls = 0
+        release = asyncio.Event()
+
+        async def query():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return calls
+
+        leader = asyncio.create_task(flight.do("key", query))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", query))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await waiter == 2
+
+    @pytest.mark.asyncio
+    async def test_waiter_cancellation_does_not_affect_leader(self):
+        """待機者がキャンセルされても、リーダーの処理は継続する."""
+        flight = SingleFlight("test_waiter_cancel")
+        release = asyncio.Event()
+
+        async def query():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.create_task(flight.do("key", query))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", query))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+
+        assert await leader == "done"